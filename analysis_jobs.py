@@ -0,0 +1,433 @@
+import gzip
+import hashlib
+import json
+import multiprocessing
+import threading
+import time
+import traceback
+import uuid
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+
+from drone_communication_analyzer import COMPARISON_STAGES, DroneCommAnalyzer, extract_comparison_metrics
+from visualization import DroneCommVisualizer
+
+try:
+    import brotli  # 可选的Brotli压缩
+    HAS_BROTLI = True
+except ImportError:
+    HAS_BROTLI = False
+
+
+# 数据分析阶段占任务总进度的百分比，其余为生成图表
+ANALYSIS_PROGRESS_SHARE = 85.0
+# 最多保留的已结束任务数量（供进度查询）
+MAX_FINISHED_JOBS = 100
+# 工作进程异常退出时任务的错误信息
+WORKER_CRASHED_ERROR = '分析进程异常退出（可能内存不足），请重试'
+# 编码好的图表在结果存储中的附加产物名称
+FIGURES_ARTIFACT = 'figures'
+
+
+class EncodedPayload:
+    """
+    预先编码、不可变的JSON响应体
+
+    只保存gzip（以及安装了brotli时的Brotli）压缩结果，ETag为未压缩内容的SHA-256加内容编码后缀，
+    内容不变时客户端的条件请求可直接返回304。
+    """
+
+    def __init__(self, chunks):
+        """
+        Args:
+            chunks (iterable): 依次拼接成完整UTF-8 JSON的字节串，逐块压缩，不保留未压缩内容
+        """
+        digest = hashlib.sha256()
+        gzip_compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        brotli_compressor = brotli.Compressor(quality=5) if HAS_BROTLI else None
+        gzip_parts, brotli_parts = [], []
+        self.raw_size = 0
+        for chunk in chunks:
+            self.raw_size += len(chunk)
+            digest.update(chunk)
+            gzip_parts.append(gzip_compressor.compress(chunk))
+            if brotli_compressor is not None:
+                brotli_parts.append(brotli_compressor.process(chunk))
+        gzip_parts.append(gzip_compressor.flush())
+        if brotli_compressor is not None:
+            brotli_parts.append(brotli_compressor.finish())
+
+        self.etag = digest.hexdigest()[:32]
+        self.gzip = b''.join(gzip_parts)
+        self.brotli = b''.join(brotli_parts) if brotli_compressor is not None else None
+
+    @property
+    def size_bytes(self):
+        """压缩数据占用的内存（字节）"""
+        return len(self.gzip) + len(self.brotli or b'')
+
+    def etag_for(self, encoding):
+        """按内容编码返回强ETag：不同编码的字节不同，在内容哈希后加上编码后缀"""
+        suffix = {'br': '-br', 'gzip': '-gz'}.get(encoding, '')
+        return self.etag + suffix
+
+    def body(self, encoding):
+        """按内容编码（'br'、'gzip'或None）返回响应体"""
+        if encoding == 'br':
+            return self.brotli
+        if encoding == 'gzip':
+            return self.gzip
+        return gzip.decompress(self.gzip)
+
+
+def _figures_json_chunks(visualizer):
+    """按{"名称":图表JSON,...}的格式逐块生成所有图表的JSON"""
+    yield b'{'
+    for index, (name, blob) in enumerate(visualizer.encode_figures()):
+        yield (b',' if index else b'') + json.dumps(name).encode('utf-8') + b':'
+        yield blob
+    yield b'}'
+
+
+class AnalysisSession:
+    """一个数据集的分析会话：分析器、可视化器及预先编码压缩的图表JSON"""
+
+    def __init__(self, dataset_name, dataset_path, fingerprint, analyzer, visualizer=None, stored_figures=None):
+        """
+        Args:
+            visualizer (DroneCommVisualizer): 已生成图表的可视化器；从结果存储恢复的会话为None
+            stored_figures (dict): 从结果存储读取的编码图表{'payload': EncodedPayload, 'count': 图表数}，
+                为None时由visualizer编码
+        """
+        self.dataset_name = dataset_name
+        self.dataset_path = dataset_path
+        self.fingerprint = fingerprint
+        self.analyzer = analyzer
+        self.visualizer = visualizer
+        self.created_at = datetime.now()
+        # 图表只序列化、压缩一次，/api/figures直接返回；未压缩的JSON逐个图表生成后即丢弃
+        if stored_figures is None:
+            stored_figures = {'payload': EncodedPayload(_figures_json_chunks(visualizer)),
+                              'count': len(visualizer.figures)}
+        self.figures_payload = stored_figures['payload']
+        self.figure_count = stored_figures['count']
+        # 估算会话占用的内存：分析器数据 + plotly图表对象（持有时按与未压缩JSON相当估算） + 压缩的图表JSON
+        self.size_bytes = analyzer.memory_usage() + self.figures_payload.size_bytes
+        if visualizer is not None:
+            self.size_bytes += self.figures_payload.raw_size
+
+    @property
+    def stored_figures(self):
+        """保存到结果存储的编码图表"""
+        return {'payload': self.figures_payload, 'count': self.figure_count}
+
+    def figures(self):
+        """
+        返回{名称: plotly图表}，供报告下载使用
+
+        从结果存储恢复的会话不持有图表对象，此时从编码的图表JSON重新构建（不缓存，避免常驻内存）。
+        """
+        if self.visualizer is not None:
+            return self.visualizer.figures
+        import plotly.io as pio
+        return {name: pio.from_json(json.dumps(figure))
+                for name, figure in json.loads(self.figures_payload.body(None)).items()}
+
+
+def build_session(dataset_name, dataset_path, fingerprint, progress_callback=None, result_store=None):
+    """
+    运行完整分析并生成图表
+
+    Args:
+        progress_callback (callable): progress_callback(阶段名, 描述, 百分比)，百分比覆盖分析和生成图表全过程
+        result_store (ResultStore): 分析结果存储，输入未变化时直接加载已保存的结果
+
+    Returns:
+        AnalysisSession: 分析会话
+    """
+    print(f"开始分析数据集: {dataset_name}")
+    print(f"数据集路径: {dataset_path}")
+
+    def report_analysis(stage, description, percent):
+        if progress_callback and stage != 'done':
+            progress_callback(stage, description, percent * ANALYSIS_PROGRESS_SHARE / 100)
+
+    analyzer = DroneCommAnalyzer(dataset_path, result_store=result_store)
+    analyzer.run_full_analysis(progress_callback=report_analysis)
+
+    result_key = analyzer.stored_result_key
+    if analyzer.restored_from_store:
+        stored_figures = result_store.load_artifact(result_key, FIGURES_ARTIFACT)
+        if stored_figures is not None:
+            print("从结果存储加载图表")
+            return AnalysisSession(dataset_name, dataset_path, fingerprint, analyzer, stored_figures=stored_figures)
+
+    print("数据分析完成，开始生成可视化...")
+    if progress_callback:
+        progress_callback('create_plots', '生成可视化图表', ANALYSIS_PROGRESS_SHARE)
+    visualizer = DroneCommVisualizer(analyzer)
+    visualizer.create_all_plots()
+    print("可视化生成完成")
+
+    session = AnalysisSession(dataset_name, dataset_path, fingerprint, analyzer, visualizer)
+    if result_key:
+        result_store.save_artifact(result_key, FIGURES_ARTIFACT, session.stored_figures)
+    return session
+
+
+def _run_job(job_id, dataset_name, dataset_path, fingerprint, progress, result_store):
+    """在工作进程中执行分析任务，当前阶段写入共享字典progress[job_id]"""
+    def report(stage, description, percent):
+        progress[job_id] = {'stage': stage, 'description': description, 'progress': round(percent, 1)}
+
+    try:
+        return build_session(dataset_name, dataset_path, fingerprint, report, result_store)
+    except Exception:
+        traceback.print_exc()
+        raise
+
+
+def compute_comparison_metrics(dataset_path, result_store=None):
+    """
+    计算数据集的对比指标（在工作进程中运行）
+
+    优先从结果存储读取已保存的分析结果，否则只运行COMPARISON_STAGES中的阶段，结果同样写入存储。
+    """
+    analyzer = DroneCommAnalyzer(dataset_path, result_store=result_store)
+    results = analyzer.load_stored_results(COMPARISON_STAGES)
+    if results is None:
+        analyzer.run_full_analysis(stages=COMPARISON_STAGES)
+        results = analyzer.analysis_results
+    return extract_comparison_metrics(results)
+
+
+class AnalysisJobQueue:
+    """
+    后台分析任务队列
+
+    分析在进程池中运行，不占用Web请求线程；同一数据集（名称和内容指纹相同）正在排队或运行的任务
+    只有一个，重复提交返回已有任务的ID；分析失败的数据集记住失败的任务，再次提交时直接返回该任务，
+    直到以retry=True重新提交或数据集内容（指纹）变化。任务完成后在主进程中调用on_complete(会话)，
+    之后任务状态才变为'done'，因此轮询到'done'时会话已经可用。数据集对比指标也在同一个进程池中并行计算。
+    """
+
+    def __init__(self, max_workers=None, on_complete=None, result_store=None):
+        """
+        初始化任务队列（进程池在首次提交任务时创建）
+
+        Args:
+            max_workers (int): 工作进程数，默认由ProcessPoolExecutor根据CPU核数决定
+            on_complete (callable): 任务成功后以AnalysisSession为参数调用
+            result_store (ResultStore): 工作进程共用的分析结果存储
+        """
+        self.max_workers = max_workers
+        self.on_complete = on_complete
+        self.result_store = result_store
+        self._lock = threading.Lock()
+        self._jobs = OrderedDict()
+        self._active = {}
+        # 分析失败的数据集 {(名称, 指纹): 任务ID}
+        self._failed = {}
+        self._executor = None
+        self._manager = None
+        self._progress = None
+
+    def submit(self, dataset_name, dataset_path, fingerprint, retry=False):
+        """
+        提交数据集分析任务
+
+        Args:
+            retry (bool): 忽略该数据集此前失败的任务，重新分析
+
+        Returns:
+            str: 任务ID；该数据集已有未结束的任务时返回该任务的ID，此前分析失败（且未要求重试）时
+                返回失败任务的ID
+        """
+        key = (dataset_name, fingerprint)
+        with self._lock:
+            job_id = self._active.get(key)
+            if job_id is not None:
+                return job_id
+            if retry:
+                self._failed.pop(key, None)
+            elif key in self._failed:
+                return self._failed[key]
+
+            self._ensure_pool()
+            job_id = uuid.uuid4().hex[:12]
+            self._jobs[job_id] = {
+                'job_id': job_id,
+                'dataset': dataset_name,
+                'fingerprint': fingerprint,
+                'status': 'queued',
+                'stage': 'queued',
+                'description': '排队等待中',
+                'progress': 0.0,
+                'error': None,
+                'submitted_at': time.time(),
+                'finished_at': None
+            }
+            self._active[key] = job_id
+            self._prune()
+            executor, future = self._submit(_run_job, job_id, dataset_name, dataset_path, fingerprint,
+                                            self._progress, self.result_store)
+
+        print(f"已提交分析任务 {job_id}: {dataset_name}")
+        future.add_done_callback(lambda done: self._finish(job_id, key, executor, done))
+        return job_id
+
+    def compare(self, datasets):
+        """
+        在进程池中并行计算多个数据集的对比指标，等待全部完成
+
+        Args:
+            datasets (dict): {数据集名称: 数据集路径}
+
+        Returns:
+            dict: {数据集名称: 指标字典}，计算失败的数据集为{'error': 错误信息}
+        """
+        if not datasets:
+            return {}
+        with self._lock:
+            futures = {name: self._submit(compute_comparison_metrics, path, self.result_store)
+                       for name, path in datasets.items()}
+        wait(future for _, future in futures.values())
+
+        metrics = {}
+        for name, (executor, future) in futures.items():
+            try:
+                metrics[name] = future.result()
+            except BrokenProcessPool:
+                self._discard_pool(executor)
+                metrics[name] = {'error': WORKER_CRASHED_ERROR}
+            except Exception as e:
+                metrics[name] = {'error': str(e)}
+        return metrics
+
+    def status(self, job_id):
+        """
+        查询任务状态
+
+        Returns:
+            dict: 任务状态（status为queued/running/done/failed，progress为百分比），任务不存在时返回None
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            job = dict(job)
+            progress = self._progress
+
+        if job['status'] in ('queued', 'running') and progress is not None:
+            current = progress.get(job_id)
+            if current:
+                job.update(current)
+                job['status'] = 'running'
+        end = job['finished_at'] or time.time()
+        job['elapsed'] = round(end - job['submitted_at'], 1)
+        return job
+
+    def shutdown(self):
+        """关闭进程池"""
+        with self._lock:
+            executor, manager = self._executor, self._manager
+            self._executor = self._manager = self._progress = None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+        if manager is not None:
+            manager.shutdown()
+
+    def _ensure_pool(self):
+        """创建进程池（调用方需持有self._lock）"""
+        # 使用spawn启动工作进程，避免在多线程的Web进程中fork
+        context = multiprocessing.get_context('spawn')
+        if self._manager is None:
+            self._manager = context.Manager()
+            self._progress = self._manager.dict()
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=context)
+
+    def _submit(self, fn, *args):
+        """
+        向进程池提交任务（调用方需持有self._lock），进程池已损坏时重建后重新提交
+
+        Returns:
+            tuple: (执行任务的进程池, Future)
+        """
+        self._ensure_pool()
+        try:
+            return self._executor, self._executor.submit(fn, *args)
+        except BrokenProcessPool:
+            self._discard_pool(self._executor, locked=True)
+            self._ensure_pool()
+            return self._executor, self._executor.submit(fn, *args)
+
+    def _discard_pool(self, executor, locked=False):
+        """
+        丢弃损坏的进程池，下次提交任务时重新创建
+
+        某个工作进程异常退出（例如分析大数据集时被OOM终止）后进程池不再可用，其中未完成的任务
+        都以BrokenProcessPool失败。只有executor仍是当前进程池时才丢弃，避免重复重建。
+        """
+        if not locked:
+            with self._lock:
+                return self._discard_pool(executor, locked=True)
+        if executor is None or self._executor is not executor:
+            return
+        self._executor = None
+        print("分析进程池已损坏，将在下次提交任务时重新创建")
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def _finish(self, job_id, key, executor, future):
+        error = None
+        try:
+            session = future.result()
+            if self.on_complete:
+                self.on_complete(session)
+        except BrokenProcessPool:
+            self._discard_pool(executor)
+            error = WORKER_CRASHED_ERROR
+            print(f"分析任务 {job_id} 失败: {error}")
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            print(f"分析任务 {job_id} 失败: {error}")
+
+        progress = self._progress
+        try:
+            # 失败的任务保留出错时所处的阶段
+            last = progress.get(job_id) if progress is not None and error else None
+        except Exception:
+            last = None
+
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                job.update(last or {})
+                job['status'] = 'failed' if error else 'done'
+                job['error'] = error
+                job['finished_at'] = time.time()
+                if not error:
+                    job.update(stage='done', description='分析完成', progress=100.0)
+            self._active.pop(key, None)
+            # 只记住每个数据集最近一次失败的任务
+            for failed_key in [k for k in self._failed if k[0] == key[0]]:
+                del self._failed[failed_key]
+            if error:
+                self._failed[key] = job_id
+
+        try:
+            if progress is not None:
+                progress.pop(job_id, None)
+        except Exception:
+            pass
+
+    def _prune(self):
+        # 记录为数据集失败结果的任务不清理
+        failed = set(self._failed.values())
+        finished = [job_id for job_id, job in self._jobs.items()
+                    if job['status'] in ('done', 'failed') and job_id not in failed]
+        for job_id in finished[:max(len(finished) - MAX_FINISHED_JOBS, 0)]:
+            del self._jobs[job_id]
@@ -6,88 +6,553 @@ from datetime import datetime, timezone, timedelta
 import os
 import glob
 import json
+import hashlib
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 import seaborn as sns
-from scipy.spatial.distance import euclidean
-from scipy import stats
+from scipy import stats, signal
 import plotly.graph_objects as go
 import plotly.express as px
 from plotly.subplots import make_subplots
 import plotly.offline as pyo
-from math import radians, cos, sin, sqrt, atan2
+
+from geodesy import LocalTangentPlane, enu_separation
+from lag_correlation import lagged_cross_correlation, resample_to_grid
+from path_loss import fit_log_distance, fit_two_ray_breakpoint, predict_range
+from quantile_sketch import QuantileSketch
+from windowed_metrics import DEFAULT_WINDOWS, compute_window_tables, grouped_percentiles
+
+try:
+    import pyarrow  # noqa: F401  Feather列式缓存依赖
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+
+# 解析缓存格式版本，缓存内容的结构变化时递增
+CACHE_VERSION = 2
+
+# 分析版本，分析算法、结果结构或图表变化时递增，结果存储中旧版本的条目随之失效
+ANALYSIS_VERSION = 2
+
+# 随结果一起持久化的分析器属性：对齐、分析后的各数据流（含分析阶段派生的列）及分析产物，
+# 命中结果存储时直接恢复，无需重新加载原始数据
+STORED_OUTPUT_ATTRIBUTES = [
+    'sender_data', 'receiver_data', 'nexfi_data', 'gps_data', 'analysis_time_range',
+    'aligned_series', 'jitter_series', 'window_metrics', 'lag_correlation_curves', 'delay_sketch', 'local_frame'
+]
+
+# GPS轨迹分段指标列（由analyze_gps_trajectory添加到gps_data中）
+TRAJECTORY_SEGMENT_COLUMNS = ['segment_distance', 'segment_dt', 'speed', 'vertical_rate']
+
+# 完整分析流程的各阶段：(方法名, 描述, 进度权重)，权重大致按典型耗时比例分配
+ANALYSIS_STAGES = [
+    ('load_data', '加载数据', 40),
+    ('analyze_clock_sync', '时钟漂移校正', 4),
+    ('analyze_udp_performance', 'UDP性能分析', 20),
+    ('analyze_nexfi_performance', 'NEXFI通信质量分析', 4),
+    ('analyze_gps_trajectory', 'GPS轨迹分析', 4),
+    ('analyze_inter_drone_distance', '双机距离分析', 4),
+    ('fuse_geometry', '逐包几何信息', 6),
+    ('analyze_correlation', '相关性分析', 6),
+    ('analyze_distance_bins', '距离分箱统计', 4),
+    ('analyze_path_loss', '路径损耗拟合', 4),
+    ('analyze_lagged_correlation', '滞后互相关', 4),
+]
+
+# 数据集对比指标所需的分析阶段（不含逐包几何融合、相关性等对比不使用的阶段）
+COMPARISON_STAGES = [
+    'load_data', 'analyze_clock_sync', 'analyze_udp_performance', 'analyze_nexfi_performance',
+    'analyze_gps_trajectory', 'analyze_inter_drone_distance'
+]
+
+# 时间对齐方式（align_mode）和数据流裁剪策略（trim_policies的取值）
+ALIGN_MODES = ('union', 'overlap')
+TRIM_POLICIES = ('trim', 'keep', 'exclude')
+# 参与时间对齐的数据流（trim_policies的键）
+TIME_STREAMS = ('udp_sender', 'udp_receiver', 'nexfi_sender', 'nexfi_receiver', 'gps_sender', 'gps_receiver')
+
+# 流式读取UDP日志时声明的列类型（未声明的列不会被读取）
+UDP_DTYPES = {
+    'timestamp': 'float64',
+    'send_timestamp': 'float64',
+    'recv_timestamp': 'float64',
+    'seq_num': 'int32',
+    'delay': 'float32',
+    'packet_size': 'uint16',
+}
+
+
+def compute_trajectory_segments(timestamps, x, y, z):
+    """
+    基于numpy diff一次性计算轨迹相邻点之间的分段指标
+    
+    Args:
+        timestamps: 按时间排序的时间戳数组（Unix秒）
+        x, y, z: 本地坐标数组（米）
+        
+    Returns:
+        dict: 'segment_distance'、'segment_dt'、'speed'、'vertical_rate'数组，长度与输入相同，
+            第i项表示第i-1点到第i点的分段，首项为NaN；时间差不为正的分段速度为NaN
+    """
+    timestamps = np.asarray(timestamps, dtype=np.float64)
+    segments = {column: np.full(len(timestamps), np.nan) for column in TRAJECTORY_SEGMENT_COLUMNS}
+    if len(timestamps) < 2:
+        return segments
+        
+    dt = np.diff(timestamps)
+    dx = np.diff(np.asarray(x, dtype=np.float64))
+    dy = np.diff(np.asarray(y, dtype=np.float64))
+    dz = np.diff(np.asarray(z, dtype=np.float64))
+    distance = np.sqrt(dx**2 + dy**2 + dz**2)
+    
+    valid = dt > 0
+    safe_dt = np.where(valid, dt, 1.0)
+    segments['segment_distance'][1:] = distance
+    segments['segment_dt'][1:] = dt
+    segments['speed'][1:] = np.where(valid, distance / safe_dt, np.nan)
+    segments['vertical_rate'][1:] = np.where(valid, dz / safe_dt, np.nan)
+    return segments
+
+
+def _run_lengths(mask):
+    """返回布尔数组中连续True段的长度数组"""
+    padded = np.concatenate(([False], mask, [False])).view(np.int8)
+    edges = np.flatnonzero(np.diff(padded))
+    return edges[1::2] - edges[0::2]
+
+
+def _sorted_unique(values):
+    """返回升序去重数组，已严格递增时直接复用输入避免排序"""
+    if len(values) < 2 or np.all(values[1:] > values[:-1]):
+        return values
+    return np.unique(values)
+
+
+def analyze_sequence_loss(sent_seq, received_seq):
+    """
+    按序列号关联发送与接收的数据包，统计逐包丢失与突发丢包特征
+    
+    序列号跨度与包数量相当时使用位图标记，否则使用排序数组集合差，均为向量化实现；
+    重复接收的包只计一次，乱序不影响丢包判断。
+    
+    Args:
+        sent_seq: 发送方序列号数组
+        received_seq: 接收方序列号数组（按到达顺序）
+        
+    Returns:
+        dict: 丢失序列号列表、突发丢包长度、丢包间隔分布、Gilbert-Elliott模型参数等
+    """
+    sent_seq = np.asarray(sent_seq, dtype=np.int64)
+    received_seq = np.asarray(received_seq, dtype=np.int64)
+    sent_unique = _sorted_unique(sent_seq)
+    
+    span = int(sent_unique[-1] - sent_unique[0]) + 1 if len(sent_unique) > 0 else 0
+    if 0 < span <= 4 * len(sent_unique):
+        # 位图：received_bitmap[seq - base]表示该序列号是否收到
+        base = sent_unique[0]
+        in_range = (received_seq >= base) & (received_seq < base + span)
+        received_bitmap = np.zeros(span, dtype=bool)
+        received_bitmap[received_seq[in_range] - base] = True
+        lost_mask = ~received_bitmap[sent_unique - base]
+        unique_received_count = np.count_nonzero(received_bitmap) + len(np.unique(received_seq[~in_range]))
+    else:
+        received_unique = _sorted_unique(received_seq)
+        lost_mask = ~np.isin(sent_unique, received_unique, assume_unique=True)
+        unique_received_count = len(received_unique)
+    lost_seq = sent_unique[lost_mask]
+    
+    # 按发送序列顺序统计突发丢包长度与两次突发之间成功接收的包数
+    burst_lengths = _run_lengths(lost_mask)
+    gaps = _run_lengths(~lost_mask)
+    if len(lost_mask) > 0:
+        # 首尾的接收段不处于两次丢包之间
+        gaps = gaps[int(not lost_mask[0]):len(gaps) - int(not lost_mask[-1])]
+        
+    # 两状态Gilbert-Elliott模型：好状态必定接收，坏状态必定丢失
+    previous, following = lost_mask[:-1], lost_mask[1:]
+    good_count = np.count_nonzero(~previous)
+    bad_count = np.count_nonzero(previous)
+    p = np.count_nonzero(~previous & following) / good_count if good_count > 0 else 0.0
+    r = np.count_nonzero(previous & ~following) / bad_count if bad_count > 0 else 0.0
+    
+    # 接收顺序中序列号小于此前最大值的包视为乱序
+    reordered = np.count_nonzero(received_seq[1:] < np.maximum.accumulate(received_seq)[:-1]) if len(received_seq) > 1 else 0
+    
+    return {
+        'unique_sent': len(sent_unique),
+        'unique_received': len(sent_unique) - len(lost_seq),
+        'duplicate_packets': len(received_seq) - unique_received_count,
+        'reordered_packets': int(reordered),
+        'lost_packets': len(lost_seq),
+        'loss_rate': len(lost_seq) / len(sent_unique) * 100 if len(sent_unique) > 0 else 0,
+        'lost_seq_nums': lost_seq,
+        'burst_lengths': burst_lengths,
+        'burst_count': len(burst_lengths),
+        'max_burst_length': int(burst_lengths.max()) if len(burst_lengths) > 0 else 0,
+        'mean_burst_length': burst_lengths.mean() if len(burst_lengths) > 0 else 0,
+        'loss_gaps': gaps,
+        'mean_loss_gap': gaps.mean() if len(gaps) > 0 else 0,
+        'gilbert_elliott': {
+            'p': p,
+            'r': r,
+            'stationary_loss': p / (p + r) if p + r > 0 else 0,
+            'mean_burst_length': 1 / r if r > 0 else 0
+        }
+    }
+
+
+def compute_jitter_series(send_times, recv_times):
+    """
+    按RFC 3550计算到达间隔抖动时间序列
+    
+    D(i-1,i) = (R_i - R_{i-1}) - (S_i - S_{i-1})，J_i = J_{i-1} + (|D| - J_{i-1}) / 16，
+    平滑递推用一阶IIR滤波器lfilter一次完成。
+    
+    Args:
+        send_times: 发送时间戳数组（秒）
+        recv_times: 接收时间戳数组（秒）
+        
+    Returns:
+        numpy结构化数组: 按到达顺序排列的timestamp（接收时间）、interarrival（到达间隔，秒）、
+            jitter（平滑抖动，秒）；首个包的到达间隔为NaN、抖动为0
+    """
+    send_times = np.asarray(send_times, dtype=np.float64)
+    recv_times = np.asarray(recv_times, dtype=np.float64)
+    if len(recv_times) > 1 and np.any(recv_times[1:] < recv_times[:-1]):
+        order = np.argsort(recv_times, kind='stable')
+        send_times, recv_times = send_times[order], recv_times[order]
+        
+    series = np.zeros(len(recv_times), dtype=[('timestamp', 'f8'), ('interarrival', 'f4'), ('jitter', 'f4')])
+    series['timestamp'] = recv_times
+    if len(recv_times) < 2:
+        series['interarrival'] = np.nan
+        return series
+        
+    interarrival = np.diff(recv_times)
+    transit_diff = np.abs(interarrival - np.diff(send_times))
+    series['interarrival'][0] = np.nan
+    series['interarrival'][1:] = interarrival
+    series['jitter'][1:] = signal.lfilter([1 / 16], [1, -15 / 16], transit_diff)
+    return series
+
+
+def _interval_stats(intervals):
+    """时间间隔数组（秒）的毫秒级汇总统计"""
+    intervals = intervals[~np.isnan(intervals)] * 1000
+    if len(intervals) == 0:
+        return {'mean': 0, 'std': 0, 'p50': 0, 'p95': 0, 'max': 0}
+    p50, p95 = np.percentile(intervals, [50, 95])
+    return {'mean': intervals.mean(), 'std': intervals.std(), 'p50': p50, 'p95': p95, 'max': intervals.max()}
+
+
+def _lower_convex_hull(x, y):
+    """按x升序排列的点集的下凸包顶点索引（单调链算法，O(N)）"""
+    hull = []
+    for i in range(len(x)):
+        while len(hull) >= 2:
+            a, b = hull[-2], hull[-1]
+            # b不在a与i连线的下方时移除
+            if (y[b] - y[a]) * (x[i] - x[a]) >= (y[i] - y[a]) * (x[b] - x[a]):
+                hull.pop()
+            else:
+                break
+        hull.append(i)
+    return np.asarray(hull, dtype=np.intp)
+
+
+def estimate_clock_drift(send_times, recv_times, window=1.0):
+    """
+    从单向传输时间的下包络估计收发双方的时钟偏移和漂移
+    
+    每个窗口取recv_timestamp - send_timestamp的最小值（排队时延最小的包），
+    对这些点求下凸包，取位于全部点下方且与各点垂直距离之和最小的凸包边作为下包络直线。
+    
+    Args:
+        send_times: 发送时间戳数组（秒）
+        recv_times: 接收时间戳数组（秒）
+        window (float): 求最小值的窗口长度（秒）
+        
+    Returns:
+        dict: reference_time（参考时刻，Unix秒）、offset（参考时刻的下包络，秒）、
+            skew（时钟漂移率，秒/秒）、hull_points（凸包顶点数）、windows（窗口数）
+    """
+    send_times = np.asarray(send_times, dtype=np.float64)
+    transit = np.asarray(recv_times, dtype=np.float64) - send_times
+    valid = ~np.isnan(transit)
+    send_times, transit = send_times[valid], transit[valid]
+    if len(transit) == 0:
+        return None
+        
+    reference_time = send_times.min()
+    elapsed = send_times - reference_time
+    # 每个窗口内传输时间最小的包
+    window_index = np.floor(elapsed / window).astype(np.int64)
+    minimum_idx = pd.Series(transit).groupby(window_index).idxmin().to_numpy()
+    x = elapsed[minimum_idx]
+    y = transit[minimum_idx]
+    order = np.argsort(x, kind='stable')
+    x, y = x[order], y[order]
+    
+    hull = _lower_convex_hull(x, y)
+    if len(hull) < 2:
+        return {'reference_time': reference_time, 'offset': y.min(), 'skew': 0.0,
+                'hull_points': len(hull), 'windows': len(x)}
+        
+    # 凸包各边所在直线在x均值处取值最大者即为垂直距离之和最小的下包络直线
+    x0, x1, y0, y1 = x[hull[:-1]], x[hull[1:]], y[hull[:-1]], y[hull[1:]]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        slopes = np.where(x1 > x0, (y1 - y0) / (x1 - x0), 0.0)
+    intercepts = y0 - slopes * x0
+    best = np.argmax(intercepts + slopes * x.mean())
+    return {'reference_time': reference_time, 'offset': intercepts[best], 'skew': slopes[best],
+            'hull_points': len(hull), 'windows': len(x)}
+
+
+def interpolate_track(times, columns, query_times, max_gap=None):
+    """
+    将按时间排序的轨迹线性插值到查询时刻
+    
+    Args:
+        times: 升序排列的轨迹时间戳数组（秒）
+        columns: 待插值的数组列表（如纬度、经度、高度）
+        query_times: 查询时间戳数组（秒）
+        max_gap (float): 相邻轨迹点间隔超过该值（秒）时不插值，为None时不限制
+        
+    Returns:
+        list: 与columns对应的插值结果数组，轨迹范围外或间隔过大处为NaN
+    """
+    times = np.asarray(times, dtype=np.float64)
+    query_times = np.asarray(query_times, dtype=np.float64)
+    if len(times) == 0:
+        return [np.full(len(query_times), np.nan) for _ in columns]
+        
+    invalid = (query_times < times[0]) | (query_times > times[-1]) | np.isnan(query_times)
+    if max_gap is not None and len(times) > 1:
+        # times[right - 1] <= query < times[right]
+        right = np.clip(np.searchsorted(times, query_times, side='right'), 1, len(times) - 1)
+        invalid |= (times[right] - times[right - 1]) > max_gap
+        
+    results = []
+    for values in columns:
+        interpolated = np.interp(query_times, times, np.asarray(values, dtype=np.float64))
+        interpolated[invalid] = np.nan
+        results.append(interpolated)
+    return results
+
+
+def extract_comparison_metrics(analysis_results):
+    """
+    从分析结果中提取数据集对比指标
+
+    Args:
+        analysis_results (dict): 至少运行了COMPARISON_STAGES的分析结果
+
+    Returns:
+        dict: 扁平的指标字典
+    """
+    metrics = {}
+    if 'udp' in analysis_results:
+        udp_stats = analysis_results['udp']
+        metrics['packet_loss_rate'] = udp_stats['packet_loss_rate']
+        metrics['avg_delay'] = udp_stats['delay_stats']['mean']
+        metrics['max_delay'] = udp_stats['delay_stats']['max']
+        metrics['throughput'] = udp_stats['throughput_kbps']
+        metrics['total_sent'] = udp_stats['total_sent']
+        metrics['total_received'] = udp_stats['total_received']
+    
+    if 'inter_drone_distance' in analysis_results:
+        distance_stats = analysis_results['inter_drone_distance']
+        metrics['avg_distance_3d'] = distance_stats['mean_distance_3d']
+        metrics['max_distance_3d'] = distance_stats['max_distance_3d']
+        metrics['min_distance_3d'] = distance_stats['min_distance_3d']
+    
+    for role, role_stats in analysis_results.get('nexfi', {}).items():
+        metrics[f'{role}_avg_rssi'] = role_stats['rssi']['mean']
+        metrics[f'{role}_avg_snr'] = role_stats['snr']['mean']
+        metrics[f'{role}_avg_link_quality'] = role_stats['link_quality']['mean']
+    
+    for role, role_stats in analysis_results.get('gps', {}).items():
+        metrics[f'{role}_flight_distance'] = role_stats['total_distance']
+        metrics[f'{role}_flight_time'] = role_stats['flight_time']
+        metrics[f'{role}_max_speed'] = role_stats['max_speed']
+    return metrics
+
+
+def dataset_fingerprint(data_folder):
+    """
+    根据数据集sender/receiver目录下所有CSV文件的相对路径、大小和修改时间生成内容指纹
+
+    只读取文件元数据，不读取文件内容；任何数据文件增删或修改后指纹都会变化。
+
+    Returns:
+        str: 16位十六进制指纹
+    """
+    digest = hashlib.sha1()
+    for role in ('sender', 'receiver'):
+        for file_path in sorted(glob.glob(os.path.join(data_folder, role, '*.csv'))):
+            stat = os.stat(file_path)
+            digest.update(f"{role}/{os.path.basename(file_path)}|{stat.st_size}|{stat.st_mtime_ns}\n".encode('utf-8'))
+    return digest.hexdigest()[:16]
+
+
+def _build_aligned_series(timestamps, distances, value_name, values):
+    """将对齐后的时间、距离和指标打包为紧凑的numpy结构化数组"""
+    series = np.empty(len(timestamps), dtype=[('timestamp', 'f8'), ('distance', 'f4'), (value_name, 'f4')])
+    series['timestamp'] = timestamps
+    series['distance'] = distances
+    series[value_name] = values
+    return series
+
+
+def _json_default(obj):
+    """JSON序列化numpy数组和标量"""
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    return str(obj)
 
 
 class DroneCommAnalyzer:
-    def __init__(self, data_folder):
+    def __init__(self, data_folder, use_cache=True, cache_dir=None, streaming=False,
+                 chunk_size=500000, time_range=None, max_workers=None, align_mode='union',
+                 trim_policies=None, windows=DEFAULT_WINDOWS, window_step=None, result_store=None):
         """
         初始化无人机通信数据分析器
         
         Args:
             data_folder (str): 测试数据文件夹路径
+            use_cache (bool): 是否使用解析后数据的列式磁盘缓存（需要pyarrow）
+            cache_dir (str): 缓存目录，默认为数据文件夹下的.cache
+            streaming (bool): 是否分块流式读取UDP日志，用于超大文件
+            chunk_size (int): 流式读取时每块的行数，决定峰值内存
+            time_range (tuple): 只保留该时间范围内的数据，(起始, 结束) Unix时间戳（秒）
+            max_workers (int): 并行解析数据流文件的线程数，默认由ThreadPoolExecutor根据CPU核数决定，
+                设为1时按顺序加载
+            align_mode (str): 时间对齐方式，'union'保留所有数据流的时间并集，
+                'overlap'只保留各数据流时间范围的交集
+            trim_policies (dict): 各数据流（如'gps_sender'、'nexfi_receiver'）的裁剪策略：
+                'trim'（默认）参与交集计算并被裁剪，'keep'参与交集计算但不裁剪，
+                'exclude'不参与交集计算但被裁剪；所有数据流都为'exclude'时使用并集范围
+            windows (tuple): 逐窗口指标的窗口长度（秒）
+            window_step (float): 滑动窗口步长（秒），为None时使用滚动窗口；各窗口长度需为其整数倍
+            result_store (ResultStore): 分析结果存储，输入文件和分析配置不变时直接加载已保存的结果
         """
+        if align_mode not in ALIGN_MODES:
+            raise ValueError(f"未知的时间对齐方式: {align_mode}，可选: {', '.join(ALIGN_MODES)}")
+        trim_policies = dict(trim_policies or {})
+        for name, policy in trim_policies.items():
+            if name not in TIME_STREAMS:
+                raise ValueError(f"未知的数据流: {name}，可选: {', '.join(TIME_STREAMS)}")
+            if policy not in TRIM_POLICIES:
+                raise ValueError(f"未知的裁剪策略: {policy}，可选: {', '.join(TRIM_POLICIES)}")
+            
         self.data_folder = data_folder
+        self.use_cache = use_cache and HAS_PYARROW
+        self.cache_dir = cache_dir or os.path.join(data_folder, '.cache')
+        self.streaming = streaming
+        self.chunk_size = chunk_size
+        self.time_range = time_range
+        self.max_workers = max_workers
+        self.align_mode = align_mode
+        self.trim_policies = trim_policies
+        self.windows = tuple(windows)
+        self.window_step = window_step
+        self.result_store = result_store
+        # 对齐后实际使用的时间范围 (起始, 结束) Unix秒
+        self.analysis_time_range = None
         self.sender_data = {}
         self.receiver_data = {}
         self.nexfi_data = {}
         self.gps_data = {}
         self.analysis_results = {}
+        # 各数据流的加载耗时统计
+        self.load_timings = {}
+        # 相关性分析中对齐后的序列（numpy结构化数组），供可视化直接复用
+        self.aligned_series = {}
+        # UDP延迟分布草图（QuantileSketch），可与其他数据集的草图合并
+        self.delay_sketch = None
+        # RFC 3550抖动时间序列（numpy结构化数组）
+        self.jitter_series = None
+        # 逐窗口UDP指标表 {窗口长度(秒): DataFrame}
+        self.window_metrics = {}
+        # 指标两两之间的滞后互相关曲线 {'指标2~指标1': (滞后数组, 相关系数数组)}
+        self.lag_correlation_curves = {}
+        # 数据集的本地ENU坐标系（参考点为全部GPS点的均值），首次使用时计算
+        self.local_frame = None
+        # 本次分析结果在结果存储中的键（未配置结果存储时为None），及结果是否从存储恢复
+        self.stored_result_key = None
+        self.restored_from_store = False
         
         # 设置中国时区 (UTC+8)
         self.china_tz = timezone(timedelta(hours=8))
         
-    def convert_to_china_time(self, timestamp_series):
-        """将时间戳转换为中国时间"""
-        return timestamp_series.dt.tz_localize('UTC').dt.tz_convert(self.china_tz)
+    def convert_to_china_time(self, epoch_seconds):
+        """
+        将Unix时间戳（秒）转换为中国时间，仅用于展示和序列化
+        
+        分析过程中所有时间均以float64 Unix秒保存在numpy数组中。
+        
+        Args:
+            epoch_seconds: 标量、numpy数组或Series
+            
+        Returns:
+            对应的带时区Timestamp、DatetimeIndex或Series
+        """
+        china_time = pd.to_datetime(epoch_seconds, unit='s', utc=True)
+        if isinstance(china_time, pd.Series):
+            return china_time.dt.tz_convert(self.china_tz)
+        return china_time.tz_convert(self.china_tz)
         
     def load_data(self):
         """加载所有数据文件并进行数据清洗"""
+        self.local_frame = None
         sender_folder = os.path.join(self.data_folder, 'sender')
         receiver_folder = os.path.join(self.data_folder, 'receiver')
         
-        # 加载UDP发送方数据
-        udp_sender_files = glob.glob(os.path.join(sender_folder, 'udp_sender_*.csv'))
-        if udp_sender_files:
-            self.sender_data['udp'] = pd.read_csv(udp_sender_files[0])
-            self.sender_data['udp']['timestamp'] = pd.to_datetime(self.sender_data['udp']['timestamp'], unit='s')
-            self.sender_data['udp']['timestamp'] = self.convert_to_china_time(self.sender_data['udp']['timestamp'])
-            
-        # 加载UDP接收方数据
-        udp_receiver_files = glob.glob(os.path.join(receiver_folder, 'udp_receiver_*.csv'))
-        if udp_receiver_files:
-            self.receiver_data['udp'] = pd.read_csv(udp_receiver_files[0])
-            self.receiver_data['udp']['send_timestamp'] = pd.to_datetime(self.receiver_data['udp']['send_timestamp'], unit='s')
-            self.receiver_data['udp']['recv_timestamp'] = pd.to_datetime(self.receiver_data['udp']['recv_timestamp'], unit='s')
-            self.receiver_data['udp']['send_timestamp'] = self.convert_to_china_time(self.receiver_data['udp']['send_timestamp'])
-            self.receiver_data['udp']['recv_timestamp'] = self.convert_to_china_time(self.receiver_data['udp']['recv_timestamp'])
-            
-        # 加载NEXFI数据
-        nexfi_sender_files = glob.glob(os.path.join(sender_folder, 'nexfi_status_*.csv'))
-        nexfi_receiver_files = glob.glob(os.path.join(receiver_folder, 'nexfi_status_*.csv'))
-        
-        if nexfi_sender_files:
-            self.nexfi_data['sender'] = pd.read_csv(nexfi_sender_files[0])
-            self.nexfi_data['sender']['timestamp'] = pd.to_datetime(self.nexfi_data['sender']['timestamp'], unit='s')
-            self.nexfi_data['sender']['timestamp'] = self.convert_to_china_time(self.nexfi_data['sender']['timestamp'])
-            
-        if nexfi_receiver_files:
-            self.nexfi_data['receiver'] = pd.read_csv(nexfi_receiver_files[0])
-            self.nexfi_data['receiver']['timestamp'] = pd.to_datetime(self.nexfi_data['receiver']['timestamp'], unit='s')
-            self.nexfi_data['receiver']['timestamp'] = self.convert_to_china_time(self.nexfi_data['receiver']['timestamp'])
-            
-        # 加载GPS数据
-        gps_sender_files = glob.glob(os.path.join(sender_folder, 'gps_logger_drone*_*.csv'))
-        gps_receiver_files = glob.glob(os.path.join(receiver_folder, 'gps_logger_drone*_*.csv'))
-        
-        if gps_sender_files:
-            self.gps_data['sender'] = pd.read_csv(gps_sender_files[0])
-            self.gps_data['sender']['timestamp'] = pd.to_datetime(self.gps_data['sender']['timestamp'], unit='s')
-            self.gps_data['sender']['timestamp'] = self.convert_to_china_time(self.gps_data['sender']['timestamp'])
-            
-        if gps_receiver_files:
-            self.gps_data['receiver'] = pd.read_csv(gps_receiver_files[0])
-            self.gps_data['receiver']['timestamp'] = pd.to_datetime(self.gps_data['receiver']['timestamp'], unit='s')
-            self.gps_data['receiver']['timestamp'] = self.convert_to_china_time(self.gps_data['receiver']['timestamp'])
-            
+        # 各数据流: (名称, 目标字典, 键, 文件模式, 时间列, 排序列, 流式过滤列)
+        # 日志轮转时同一数据流会有多个文件，全部加载后按时间合并
+        stream_specs = [
+            ('udp_sender', self.sender_data, 'udp', os.path.join(sender_folder, 'udp_sender_*.csv'),
+             ['timestamp'], 'timestamp', 'timestamp'),
+            ('udp_receiver', self.receiver_data, 'udp', os.path.join(receiver_folder, 'udp_receiver_*.csv'),
+             ['send_timestamp', 'recv_timestamp'], 'recv_timestamp', 'recv_timestamp'),
+            ('nexfi_sender', self.nexfi_data, 'sender', os.path.join(sender_folder, 'nexfi_status_*.csv'),
+             ['timestamp'], 'timestamp', None),
+            ('nexfi_receiver', self.nexfi_data, 'receiver', os.path.join(receiver_folder, 'nexfi_status_*.csv'),
+             ['timestamp'], 'timestamp', None),
+            ('gps_sender', self.gps_data, 'sender', os.path.join(sender_folder, 'gps_logger_drone*_*.csv'),
+             ['timestamp'], 'timestamp', None),
+            ('gps_receiver', self.gps_data, 'receiver', os.path.join(receiver_folder, 'gps_logger_drone*_*.csv'),
+             ['timestamp'], 'timestamp', None),
+        ]
+        
+        # 所有数据流的所有文件提交到同一个线程池并行解析，总耗时取决于最大的文件
+        load_start = time.perf_counter()
+        self.load_timings = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            pending = []
+            for name, target, key, pattern, time_columns, sort_column, filter_column in stream_specs:
+                file_paths = sorted(glob.glob(pattern))
+                if file_paths:
+                    futures = [executor.submit(self._timed_load_csv, path, time_columns, filter_column)
+                               for path in file_paths]
+                    pending.append((name, target, key, sort_column, futures))
+                    
+            for name, target, key, sort_column, futures in pending:
+                results = [future.result() for future in futures]
+                merge_start = time.perf_counter()
+                target[key] = self._merge_sorted_frames([frame for frame, _ in results], sort_column)
+                self.load_timings[name] = {
+                    'files': len(results),
+                    'rows': len(target[key]),
+                    'parse_seconds': max(duration for _, duration in results),
+                    'merge_seconds': time.perf_counter() - merge_start
+                }
+        load_seconds = time.perf_counter() - load_start
+        
         # 数据清洗和时间范围对齐
         self._clean_and_align_data()
         
@@ -99,89 +564,270 @@ class DroneCommAnalyzer:
         print(f"  发送方GPS数据: {len(self.gps_data.get('sender', []))} 条记录")
         print(f"  接收方GPS数据: {len(self.gps_data.get('receiver', []))} 条记录")
         
+        print(f"各数据流加载耗时（总计 {load_seconds:.2f} 秒）:")
+        for name, timing in self.load_timings.items():
+            print(f"  {name}: {timing['files']} 个文件, {timing['rows']} 行, "
+                  f"解析 {timing['parse_seconds']:.2f} 秒, 合并 {timing['merge_seconds']:.2f} 秒")
+        
         # 打印时间范围信息
         self._print_time_ranges()
         
+    def _stream_frames(self):
+        """按数据流名称返回已加载的DataFrame"""
+        streams = {
+            'udp_sender': self.sender_data.get('udp'),
+            'udp_receiver': self.receiver_data.get('udp'),
+            'nexfi_sender': self.nexfi_data.get('sender'),
+            'nexfi_receiver': self.nexfi_data.get('receiver'),
+            'gps_sender': self.gps_data.get('sender'),
+            'gps_receiver': self.gps_data.get('receiver'),
+        }
+        return {name: frame for name, frame in streams.items() if frame is not None}
+        
+    def _timed_load_csv(self, file_path, time_columns, filter_column=None):
+        """解析单个文件并返回(数据, 耗时秒数)，供线程池调用"""
+        start = time.perf_counter()
+        data = self._load_csv(file_path, time_columns, filter_column)
+        return data, time.perf_counter() - start
+        
+    @staticmethod
+    def _merge_sorted_frames(frames, sort_column):
+        """合并各自有序的数据表，并去除日志轮转边界处重复的行"""
+        if len(frames) == 1:
+            data = frames[0]
+        else:
+            data = pd.concat(frames, ignore_index=True)
+            
+        if not data[sort_column].is_monotonic_increasing:
+            # 稳定排序（timsort）会识别已有序的分段，对多个有序文件相当于k路归并
+            data = data.sort_values(sort_column, kind='stable', ignore_index=True)
+            
+        if len(frames) > 1:
+            data = data.drop_duplicates(ignore_index=True)
+        return data
+        
+    def _load_csv(self, file_path, time_columns, filter_column=None):
+        """
+        读取CSV文件并将时间列统一为float64 Unix秒，优先从列式缓存读取
+        
+        Args:
+            file_path (str): CSV文件路径
+            time_columns (list): Unix时间戳（秒）列名
+            filter_column (str): 流式模式下用于按时间范围逐块过滤的列，为None时不流式读取
+            
+        Returns:
+            DataFrame: 解析后的数据
+        """
+        streaming = self.streaming and filter_column is not None
+        variant = f"stream|{self.time_range}" if streaming else "full"
+        cache_path = self._get_cache_path(file_path, variant)
+        if cache_path and os.path.exists(cache_path):
+            try:
+                return pd.read_feather(cache_path)
+            except Exception as e:
+                print(f"读取缓存失败，重新解析 {file_path}: {e}")
+                
+        if streaming:
+            data = self._read_csv_chunked(file_path, filter_column)
+        else:
+            data = pd.read_csv(file_path)
+        for column in time_columns:
+            if data[column].dtype != np.float64:
+                data[column] = data[column].astype(np.float64)
+            
+        if cache_path:
+            self._write_cache(data, cache_path)
+        return data
+        
+    def _read_csv_chunked(self, file_path, filter_column):
+        """按固定行数分块读取UDP日志，使用声明的列类型并逐块按时间范围过滤"""
+        chunks = []
+        reader = pd.read_csv(file_path, usecols=lambda column: column in UDP_DTYPES,
+                             dtype=UDP_DTYPES, chunksize=self.chunk_size)
+        for chunk in reader:
+            if self.time_range is not None:
+                start, end = self.time_range
+                times = chunk[filter_column]
+                chunk = chunk[(times >= start) & (times <= end)]
+            chunks.append(chunk)
+            
+        return pd.concat(chunks, ignore_index=True)
+        
+    def _get_cache_path(self, file_path, variant):
+        """根据源文件路径、大小、修改时间和读取方式生成缓存文件路径"""
+        if not self.use_cache:
+            return None
+            
+        source = os.path.abspath(file_path)
+        stat = os.stat(source)
+        source_key = hashlib.sha1(f"{source}|{variant}".encode('utf-8')).hexdigest()[:16]
+        version_key = hashlib.sha1(
+            f"{source}|{stat.st_size}|{stat.st_mtime_ns}|{CACHE_VERSION}".encode('utf-8')
+        ).hexdigest()[:16]
+        return os.path.join(self.cache_dir, f"{source_key}_{version_key}.feather")
+        
+    def _write_cache(self, data, cache_path):
+        """写入Feather缓存，并清理同一源文件的过期缓存"""
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            source_key = os.path.basename(cache_path).split('_')[0]
+            for stale_path in glob.glob(os.path.join(self.cache_dir, f"{source_key}_*.feather")):
+                if stale_path != cache_path:
+                    os.remove(stale_path)
+                    
+            # 先写临时文件再原子替换，避免并发读取到不完整的缓存
+            temp_path = f"{cache_path}.{os.getpid()}.tmp"
+            data.to_feather(temp_path)
+            os.replace(temp_path, cache_path)
+        except Exception as e:
+            print(f"写入缓存失败 {cache_path}: {e}")
+            
+    def _iter_time_streams(self):
+        """遍历已加载的非空数据流，返回(名称, 数据字典, 键, 时间列)"""
+        streams = [
+            ('udp_sender', self.sender_data, 'udp', 'timestamp'),
+            ('udp_receiver', self.receiver_data, 'udp', 'recv_timestamp'),
+            ('nexfi_sender', self.nexfi_data, 'sender', 'timestamp'),
+            ('nexfi_receiver', self.nexfi_data, 'receiver', 'timestamp'),
+            ('gps_sender', self.gps_data, 'sender', 'timestamp'),
+            ('gps_receiver', self.gps_data, 'receiver', 'timestamp'),
+        ]
+        for name, target, key, time_column in streams:
+            if key in target and not target[key].empty:
+                yield name, target, key, time_column
+                
     def _clean_and_align_data(self):
         """清洗和对齐数据，确保时间范围一致"""
-        all_timestamps = []
-        
-        # 收集所有时间戳
-        for data_type in ['udp']:
-            if data_type in self.sender_data and not self.sender_data[data_type].empty:
-                all_timestamps.extend(self.sender_data[data_type]['timestamp'].tolist())
-            if data_type in self.receiver_data and not self.receiver_data[data_type].empty:
-                if data_type == 'udp':
-                    all_timestamps.extend(self.receiver_data[data_type]['recv_timestamp'].tolist())
-                else:
-                    all_timestamps.extend(self.receiver_data[data_type]['timestamp'].tolist())
-        
-        for role in ['sender', 'receiver']:
-            if role in self.nexfi_data and not self.nexfi_data[role].empty:
-                all_timestamps.extend(self.nexfi_data[role]['timestamp'].tolist())
-            if role in self.gps_data and not self.gps_data[role].empty:
-                all_timestamps.extend(self.gps_data[role]['timestamp'].tolist())
+        # 逐列做min/max归约得到各数据流的时间范围，不物化时间戳列表
+        stream_ranges = {
+            name: (target[key][time_column].min(), target[key][time_column].max())
+            for name, target, key, time_column in self._iter_time_streams()
+        }
         
-        if not all_timestamps:
+        if not stream_ranges:
             return
             
-        # 确定总的时间范围
-        min_time = min(all_timestamps)
-        max_time = max(all_timestamps)
+        # 策略为exclude的数据流不参与交集计算
+        bounding_ranges = [time_range for name, time_range in stream_ranges.items()
+                           if self.trim_policies.get(name, 'trim') != 'exclude']
+        if self.align_mode == 'overlap' and bounding_ranges:
+            # 取各数据流时间范围的交集
+            min_time = max(start for start, _ in bounding_ranges)
+            max_time = min(end for _, end in bounding_ranges)
+        else:
+            if self.align_mode == 'overlap':
+                print("没有参与交集计算的数据流，使用所有数据流时间范围的并集")
+            # 确定总的时间范围
+            min_time = min(start for start, _ in stream_ranges.values())
+            max_time = max(end for _, end in stream_ranges.values())
         
-        print(f"数据时间范围: {min_time} 到 {max_time}")
+        # 用户指定的时间范围
+        if self.time_range is not None:
+            min_time = max(min_time, self.time_range[0])
+            max_time = min(max_time, self.time_range[1])
+            
+        if min_time > max_time:
+            print("各数据流时间范围没有重叠，跳过时间范围过滤")
+            return
+            
+        self.analysis_time_range = (min_time, max_time)
+        print(f"数据时间范围: {self.convert_to_china_time(min_time)} 到 {self.convert_to_china_time(max_time)}")
         
         # 基于重叠时间过滤数据
         self._filter_data_by_time_range(min_time, max_time)
         
     def _filter_data_by_time_range(self, min_time, max_time):
-        """根据指定的时间范围过滤数据"""
-        # 过滤UDP数据
-        if 'udp' in self.sender_data:
-            mask = (self.sender_data['udp']['timestamp'] >= min_time) & (self.sender_data['udp']['timestamp'] <= max_time)
-            self.sender_data['udp'] = self.sender_data['udp'][mask].copy()
+        """根据指定的时间范围过滤数据，策略为keep的数据流保持不变"""
+        for name, target, key, time_column in list(self._iter_time_streams()):
+            if self.trim_policies.get(name, 'trim') == 'keep':
+                continue
+            target[key] = self._filter_frame(target[key], time_column, min_time, max_time)
             
-        if 'udp' in self.receiver_data:
-            mask = (self.receiver_data['udp']['recv_timestamp'] >= min_time) & (self.receiver_data['udp']['recv_timestamp'] <= max_time)
-            self.receiver_data['udp'] = self.receiver_data['udp'][mask].copy()
+    @staticmethod
+    def _filter_frame(data, time_column, min_time, max_time):
+        """按时间范围过滤单个数据表，全部在范围内时直接返回原表避免复制"""
+        times = data[time_column]
+        if times.is_monotonic_increasing:
+            # 已排序的数据流用二分查找定位边界，切片不复制数据
+            start = times.searchsorted(min_time, side='left')
+            end = times.searchsorted(max_time, side='right')
+            if start == 0 and end == len(data):
+                return data
+            return data.iloc[start:end]
             
-        # 过滤NEXFI数据
-        for role in ['sender', 'receiver']:
-            if role in self.nexfi_data:
-                mask = (self.nexfi_data[role]['timestamp'] >= min_time) & (self.nexfi_data[role]['timestamp'] <= max_time)
-                self.nexfi_data[role] = self.nexfi_data[role][mask].copy()
-                
-        # 过滤GPS数据
-        for role in ['sender', 'receiver']:
-            if role in self.gps_data:
-                mask = (self.gps_data[role]['timestamp'] >= min_time) & (self.gps_data[role]['timestamp'] <= max_time)
-                self.gps_data[role] = self.gps_data[role][mask].copy()
-                
+        mask = ((times >= min_time) & (times <= max_time)).to_numpy()
+        if mask.all():
+            return data
+        # take只复制一次且返回独立的数据表，后续添加列不会触发SettingWithCopyWarning
+        return data.take(np.flatnonzero(mask))
+        
     def _print_time_ranges(self):
         """打印各数据源的时间范围"""
         print("\n各数据源时间范围:")
         
         if 'udp' in self.sender_data and not self.sender_data['udp'].empty:
-            start = self.sender_data['udp']['timestamp'].min()
-            end = self.sender_data['udp']['timestamp'].max()
+            start = self.convert_to_china_time(self.sender_data['udp']['timestamp'].min())
+            end = self.convert_to_china_time(self.sender_data['udp']['timestamp'].max())
             print(f"  发送方UDP: {start} 到 {end}")
             
         if 'udp' in self.receiver_data and not self.receiver_data['udp'].empty:
-            start = self.receiver_data['udp']['recv_timestamp'].min()
-            end = self.receiver_data['udp']['recv_timestamp'].max()
+            start = self.convert_to_china_time(self.receiver_data['udp']['recv_timestamp'].min())
+            end = self.convert_to_china_time(self.receiver_data['udp']['recv_timestamp'].max())
             print(f"  接收方UDP: {start} 到 {end}")
             
         for role in ['sender', 'receiver']:
             if role in self.nexfi_data and not self.nexfi_data[role].empty:
-                start = self.nexfi_data[role]['timestamp'].min()
-                end = self.nexfi_data[role]['timestamp'].max()
+                start = self.convert_to_china_time(self.nexfi_data[role]['timestamp'].min())
+                end = self.convert_to_china_time(self.nexfi_data[role]['timestamp'].max())
                 print(f"  {role} NEXFI: {start} 到 {end}")
                 
             if role in self.gps_data and not self.gps_data[role].empty:
-                start = self.gps_data[role]['timestamp'].min()
-                end = self.gps_data[role]['timestamp'].max()
+                start = self.convert_to_china_time(self.gps_data[role]['timestamp'].min())
+                end = self.convert_to_china_time(self.gps_data[role]['timestamp'].max())
                 print(f"  {role} GPS: {start} 到 {end}")
         
+    def analyze_clock_sync(self, window=1.0):
+        """
+        估计收发双方的时钟漂移，为UDP接收数据添加corrected_delay列
+        
+        假设双方时钟在测试开始时已同步，corrected_delay从单向传输时间中扣除下包络直线
+        相对于起始时刻的漂移量；UDP性能和相关性分析优先使用该列。
+        
+        Args:
+            window (float): 求传输时间下包络时的窗口长度（秒）
+        """
+        if 'udp' not in self.receiver_data or self.receiver_data['udp'].empty:
+            return
+        receiver_udp = self.receiver_data['udp']
+        if not {'send_timestamp', 'recv_timestamp'} <= set(receiver_udp.columns):
+            print("UDP接收数据缺少收发时间戳，跳过时钟同步")
+            return
+            
+        send_times = receiver_udp['send_timestamp'].to_numpy(dtype=np.float64)
+        recv_times = receiver_udp['recv_timestamp'].to_numpy(dtype=np.float64)
+        drift = estimate_clock_drift(send_times, recv_times, window)
+        if drift is None:
+            return
+            
+        receiver_udp['corrected_delay'] = (recv_times - send_times) - drift['skew'] * (send_times - drift['reference_time'])
+        duration = send_times.max() - drift['reference_time']
+        self.analysis_results['clock_sync'] = {
+            'offset_ms': drift['offset'] * 1000,
+            'skew_ppm': drift['skew'] * 1e6,
+            'drift_over_test_ms': drift['skew'] * duration * 1000,
+            'hull_points': drift['hull_points'],
+            'windows': drift['windows']
+        }
+        
+        print(f"\n时钟同步分析结果:")
+        print(f"  下包络偏移: {drift['offset'] * 1000:.2f} ms")
+        print(f"  时钟漂移: {drift['skew'] * 1e6:.2f} ppm (测试期间累计 {drift['skew'] * duration * 1000:.2f} ms)")
+        
+    @staticmethod
+    def _delay_column(receiver_udp):
+        """优先使用经时钟漂移校正的延迟列"""
+        return 'corrected_delay' if 'corrected_delay' in receiver_udp.columns else 'delay'
+        
     def analyze_udp_performance(self):
         """分析UDP通信性能"""
         if 'udp' not in self.sender_data or 'udp' not in self.receiver_data:
@@ -194,34 +840,68 @@ class DroneCommAnalyzer:
         # 计算基本统计
         total_sent = len(sender_udp)
         total_received = len(receiver_udp)
-        packet_loss_rate = (total_sent - total_received) / total_sent * 100 if total_sent > 0 else 0
         
-        # 延迟统计
-        if not receiver_udp.empty and 'delay' in receiver_udp.columns:
+        # 按序列号逐包关联，缺少序列号时退回行数差
+        if 'seq_num' in sender_udp.columns and 'seq_num' in receiver_udp.columns and total_sent > 0:
+            sequence_loss = analyze_sequence_loss(sender_udp['seq_num'].to_numpy(), receiver_udp['seq_num'].to_numpy())
+            packet_loss_rate = sequence_loss['loss_rate']
+        else:
+            sequence_loss = None
+            packet_loss_rate = (total_sent - total_received) / total_sent * 100 if total_sent > 0 else 0
+        
+        # 延迟统计：按块喂入可合并的分位数草图，不需要对整列排序
+        self.delay_sketch = QuantileSketch()
+        delay_column = self._delay_column(receiver_udp)
+        if not receiver_udp.empty and delay_column in receiver_udp.columns:
+            delays = receiver_udp[delay_column].to_numpy()
+            for start in range(0, len(delays), self.chunk_size):
+                self.delay_sketch.add(delays[start:start + self.chunk_size])
+                
+        if self.delay_sketch.count > 0:
+            sketch = self.delay_sketch
+            p50, p95, p99, p999 = sketch.quantiles([0.5, 0.95, 0.99, 0.999])
             delay_stats = {
-                'mean': receiver_udp['delay'].mean() * 1000,  # 转换为毫秒
-                'median': receiver_udp['delay'].median() * 1000,
-                'std': receiver_udp['delay'].std() * 1000,
-                'min': receiver_udp['delay'].min() * 1000,
-                'max': receiver_udp['delay'].max() * 1000,
-                'p95': receiver_udp['delay'].quantile(0.95) * 1000,
-                'p99': receiver_udp['delay'].quantile(0.99) * 1000
+                'mean': sketch.mean * 1000,  # 转换为毫秒
+                'median': p50 * 1000,
+                'std': sketch.std * 1000,
+                'min': sketch.min * 1000,
+                'max': sketch.max * 1000,
+                'p95': p95 * 1000,
+                'p99': p99 * 1000,
+                'p999': p999 * 1000
             }
         else:
             delay_stats = {
-                'mean': 0, 'median': 0, 'std': 0, 'min': 0, 'max': 0, 'p95': 0, 'p99': 0
+                'mean': 0, 'median': 0, 'std': 0, 'min': 0, 'max': 0, 'p95': 0, 'p99': 0, 'p999': 0
             }
         
-        # 计算吞吐量
+        # RFC 3550抖动、到达间隔分布与发送节奏偏差
+        jitter_stats = self._analyze_jitter(sender_udp, receiver_udp)
+        
+        # 计算吞吐量：按接收包的实际字节数累计
         if not sender_udp.empty:
-            test_duration = (sender_udp['timestamp'].max() - sender_udp['timestamp'].min()).total_seconds()
-            if test_duration > 0 and 'packet_size' in sender_udp.columns:
-                throughput_kbps = (total_received * sender_udp['packet_size'].iloc[0] * 8) / (test_duration * 1000)
+            test_duration = sender_udp['timestamp'].max() - sender_udp['timestamp'].min()
+            received_bytes = self._received_packet_sizes(sender_udp, receiver_udp).sum()
+            if test_duration > 0 and received_bytes > 0:
+                throughput_kbps = received_bytes * 8 / (test_duration * 1000)
             else:
                 throughput_kbps = 0
         else:
             test_duration = 0
             throughput_kbps = 0
+            
+        # 逐窗口指标
+        self.window_metrics = self._compute_window_metrics(sender_udp, receiver_udp)
+        window_summary = {
+            f'{window:g}s': {
+                'windows': len(table),
+                'max_loss_rate': table['loss_rate'].max(),
+                'max_delay_p99': table['delay_p99'].max(),
+                'min_throughput_kbps': table['throughput_kbps'].min(),
+                'max_throughput_kbps': table['throughput_kbps'].max()
+            }
+            for window, table in self.window_metrics.items() if not table.empty
+        }
         
         self.analysis_results['udp'] = {
             'total_sent': total_sent,
@@ -229,20 +909,95 @@ class DroneCommAnalyzer:
             'packet_loss_rate': packet_loss_rate,
             'delay_stats': delay_stats,
             'throughput_kbps': throughput_kbps,
-            'test_duration': test_duration
+            'test_duration': test_duration,
+            'sequence_loss': sequence_loss,
+            'jitter': jitter_stats,
+            'window_summary': window_summary
         }
         
         print(f"\nUDP性能分析结果:")
         print(f"  总发包数: {total_sent}")
         print(f"  总收包数: {total_received}")
         print(f"  丢包率: {packet_loss_rate:.2f}%")
+        if sequence_loss is not None:
+            ge = sequence_loss['gilbert_elliott']
+            print(f"  丢包突发: {sequence_loss['burst_count']} 次, 最长 {sequence_loss['max_burst_length']} 包, "
+                  f"平均 {sequence_loss['mean_burst_length']:.2f} 包")
+            print(f"  重复包: {sequence_loss['duplicate_packets']}, 乱序包: {sequence_loss['reordered_packets']}")
+            print(f"  Gilbert-Elliott参数: p={ge['p']:.4f}, r={ge['r']:.4f}")
         print(f"  平均延迟: {delay_stats['mean']:.2f} ms")
         print(f"  最大延迟: {delay_stats['max']:.2f} ms")
         print(f"  延迟标准差: {delay_stats['std']:.2f} ms")
         print(f"  95%延迟: {delay_stats['p95']:.2f} ms")
+        print(f"  99.9%延迟: {delay_stats['p999']:.2f} ms")
+        if jitter_stats is not None:
+            print(f"  RFC 3550抖动: {jitter_stats['final_jitter']:.2f} ms (平均 {jitter_stats['mean_jitter']:.2f} ms)")
         print(f"  吞吐量: {throughput_kbps:.2f} kbps")
         print(f"  测试持续时间: {test_duration:.1f} 秒")
         
+    def _analyze_jitter(self, sender_udp, receiver_udp):
+        """计算抖动时间序列（保存到self.jitter_series）及抖动、到达间隔、发送节奏的汇总统计"""
+        if receiver_udp.empty or not {'send_timestamp', 'recv_timestamp'} <= set(receiver_udp.columns):
+            self.jitter_series = None
+            return None
+            
+        series = compute_jitter_series(receiver_udp['send_timestamp'].to_numpy(),
+                                       receiver_udp['recv_timestamp'].to_numpy())
+        self.jitter_series = series
+        jitter_ms = series['jitter'].astype(np.float64) * 1000
+        
+        # 发送节奏：发送间隔相对名义间隔（中位数）的偏差
+        send_times = np.sort(sender_udp['timestamp'].to_numpy(dtype=np.float64)) if not sender_udp.empty else np.empty(0)
+        send_intervals = np.diff(send_times)
+        if len(send_intervals) > 0:
+            nominal_interval = np.median(send_intervals)
+            deviation_ms = np.abs(send_intervals - nominal_interval) * 1000
+            pacing = {
+                'nominal_interval': nominal_interval * 1000,
+                'mean_abs_deviation': deviation_ms.mean(),
+                'p95_abs_deviation': np.percentile(deviation_ms, 95),
+                'max_abs_deviation': deviation_ms.max()
+            }
+        else:
+            pacing = {'nominal_interval': 0, 'mean_abs_deviation': 0, 'p95_abs_deviation': 0, 'max_abs_deviation': 0}
+            
+        return {
+            'final_jitter': jitter_ms[-1],
+            'mean_jitter': jitter_ms.mean(),
+            'max_jitter': jitter_ms.max(),
+            'p95_jitter': np.percentile(jitter_ms, 95),
+            'interarrival': _interval_stats(series['interarrival'].astype(np.float64)),
+            'send_interval': _interval_stats(send_intervals),
+            'send_pacing': pacing
+        }
+        
+    @staticmethod
+    def _received_packet_sizes(sender_udp, receiver_udp):
+        """接收包的逐包字节数，接收日志缺少packet_size时使用发送方的包大小中位数"""
+        if 'packet_size' in receiver_udp.columns:
+            return receiver_udp['packet_size'].to_numpy(dtype=np.float64)
+        if 'packet_size' in sender_udp.columns and not sender_udp.empty:
+            return np.full(len(receiver_udp), sender_udp['packet_size'].median(), dtype=np.float64)
+        return np.zeros(len(receiver_udp))
+        
+    def _compute_window_metrics(self, sender_udp, receiver_udp):
+        """按配置的窗口长度计算逐窗口UDP指标表"""
+        if receiver_udp.empty or not {'send_timestamp', 'recv_timestamp', 'delay'} <= set(receiver_udp.columns):
+            return {}
+            
+        jitter_times = jitter = None
+        if self.jitter_series is not None:
+            jitter_times, jitter = self.jitter_series['timestamp'], self.jitter_series['jitter']
+            
+        # 各窗口长度共用一次延迟排序和细分桶统计
+        tables = compute_window_tables(
+            sender_udp['timestamp'].to_numpy(), receiver_udp['send_timestamp'].to_numpy(),
+            receiver_udp['recv_timestamp'].to_numpy(), receiver_udp[self._delay_column(receiver_udp)].to_numpy(),
+            self._received_packet_sizes(sender_udp, receiver_udp),
+            jitter_times, jitter, windows=self.windows, step=self.window_step
+        )
+        return {window: tables[float(window)] for window in self.windows}
+        
     def analyze_nexfi_performance(self):
         """分析NEXFI通信质量"""
         nexfi_results = {}
@@ -297,34 +1052,26 @@ class DroneCommAnalyzer:
             if data.empty:
                 continue
                 
-            # 计算3D距离
-            distances = []
-            if len(data) > 1:
-                for i in range(1, len(data)):
-                    dist = euclidean(
-                        [data.iloc[i]['local_x'], data.iloc[i]['local_y'], data.iloc[i]['local_z']],
-                        [data.iloc[i-1]['local_x'], data.iloc[i-1]['local_y'], data.iloc[i-1]['local_z']]
-                    )
-                    distances.append(dist)
-                    
-            # 计算速度
-            speeds = []
-            if len(data) > 1:
-                for i in range(1, len(data)):
-                    time_diff = (data.iloc[i]['timestamp'] - data.iloc[i-1]['timestamp']).total_seconds()
-                    if time_diff > 0 and i-1 < len(distances):
-                        speed = distances[i-1] / time_diff
-                        speeds.append(speed)
+            # 一次性计算相邻轨迹点的距离、时间差、速度和垂直速度，并作为列保存供可视化复用
+            segments = compute_trajectory_segments(
+                data['timestamp'].to_numpy(), data['local_x'].to_numpy(),
+                data['local_y'].to_numpy(), data['local_z'].to_numpy()
+            )
+            for column, values in segments.items():
+                data[column] = values
+                
+            distances = segments['segment_distance'][1:]
+            speeds = segments['speed'][~np.isnan(segments['speed'])]
                         
             # 计算航迹统计
             stats = {
-                'total_distance': sum(distances) if distances else 0,
+                'total_distance': distances.sum() if len(distances) > 0 else 0,
                 'max_altitude': data['altitude'].max() if 'altitude' in data.columns else 0,
                 'min_altitude': data['altitude'].min() if 'altitude' in data.columns else 0,
                 'altitude_change': (data['altitude'].max() - data['altitude'].min()) if 'altitude' in data.columns else 0,
-                'max_speed': max(speeds) if speeds else 0,
-                'avg_speed': np.mean(speeds) if speeds else 0,
-                'flight_time': (data['timestamp'].max() - data['timestamp'].min()).total_seconds(),
+                'max_speed': speeds.max() if len(speeds) > 0 else 0,
+                'avg_speed': speeds.mean() if len(speeds) > 0 else 0,
+                'flight_time': data['timestamp'].max() - data['timestamp'].min(),
                 'data_points': len(data)
             }
             
@@ -342,12 +1089,45 @@ class DroneCommAnalyzer:
             print(f"    平均速度: {stats['avg_speed']:.2f} m/s")
             print(f"    飞行时间: {stats['flight_time']:.1f} s")
             
-    def analyze_inter_drone_distance(self):
-        """分析双机之间的3D距离"""
+    def get_local_frame(self):
+        """返回数据集的本地ENU坐标系，参考点为全部GPS点的均值，计算一次后缓存"""
+        if self.local_frame is None:
+            points = [gps.dropna(subset=['latitude', 'longitude']) for gps in self.gps_data.values()
+                      if not gps.empty and {'latitude', 'longitude'} <= set(gps.columns)]
+            points = [gps for gps in points if not gps.empty]
+            if not points:
+                return None
+            latitudes = np.concatenate([gps['latitude'].to_numpy(dtype=np.float64) for gps in points])
+            longitudes = np.concatenate([gps['longitude'].to_numpy(dtype=np.float64) for gps in points])
+            altitudes = np.concatenate([gps['altitude'].to_numpy(dtype=np.float64) if 'altitude' in gps.columns
+                                        else np.zeros(len(gps)) for gps in points])
+            self.local_frame = LocalTangentPlane.from_points(latitudes, longitudes, altitudes)
+        return self.local_frame
+        
+    def ensure_local_coordinates(self):
+        """为各GPS数据添加本地ENU坐标列east、north、up（米），已存在时直接复用"""
+        frame = self.get_local_frame()
+        if frame is None:
+            return
+        for gps in self.gps_data.values():
+            if gps.empty or 'east' in gps.columns:
+                continue
+            altitudes = gps['altitude'].to_numpy(dtype=np.float64) if 'altitude' in gps.columns else np.zeros(len(gps))
+            gps['east'], gps['north'], gps['up'] = frame.to_enu(
+                gps['latitude'].to_numpy(dtype=np.float64), gps['longitude'].to_numpy(dtype=np.float64), altitudes)
+                
+    def analyze_inter_drone_distance(self, max_time_diff=1.0):
+        """
+        分析双机之间的3D距离
+        
+        Args:
+            max_time_diff (float): 双机GPS数据点配对允许的最大时间差（秒）
+        """
         if 'sender' not in self.gps_data or 'receiver' not in self.gps_data:
             print("GPS数据不完整，无法计算双机距离")
             return
             
+        self.ensure_local_coordinates()
         sender_gps = self.gps_data['sender']
         receiver_gps = self.gps_data['receiver']
         
@@ -365,55 +1145,29 @@ class DroneCommAnalyzer:
             print("时间重叠部分无数据")
             return
             
-        # 对齐时间戳
-        distances_3d = []
-        distances_horizontal = []
-        distances_vertical = []
-        timestamps = []
+        # 按时间排序后做最近邻 as-of 连接，时间差超过容差的点丢弃
+        sender_sorted = sender_gps_filtered[['timestamp', 'east', 'north', 'up']].sort_values(
+            'timestamp', kind='mergesort')
+        receiver_sorted = receiver_gps_filtered[['timestamp', 'east', 'north', 'up']].sort_values(
+            'timestamp', kind='mergesort')
         
-        for _, sender_row in sender_gps_filtered.iterrows():
-            # 找最近的接收方数据点
-            time_diffs = abs(receiver_gps_filtered['timestamp'] - sender_row['timestamp'])
-            if time_diffs.empty:
-                continue
-                
-            closest_idx = time_diffs.idxmin()
-            
-            # 如果时间差太大（超过1秒），跳过
-            if time_diffs[closest_idx].total_seconds() > 1:
-                continue
-                
-            receiver_row = receiver_gps_filtered.loc[closest_idx]
-            
-            # 使用经纬度计算距离
-            # 将经纬度转换为米（使用简单的球面距离公式）
-            # 地球半径（米）
-            R = 6371000
-            
-            lat1 = radians(sender_row['latitude'])
-            lon1 = radians(sender_row['longitude'])
-            lat2 = radians(receiver_row['latitude'])
-            lon2 = radians(receiver_row['longitude'])
-            
-            # 计算水平距离（使用Haversine公式）
-            dlat = lat2 - lat1
-            dlon = lon2 - lon1
-            a = sin(dlat/2)**2 + cos(lat1) * cos(lat2) * sin(dlon/2)**2
-            c = 2 * atan2(sqrt(a), sqrt(1-a))
-            horizontal_distance = R * c
-            
-            # 计算垂直距离（高度差）
-            vertical_distance = abs(receiver_row['altitude'] - sender_row['altitude'])
-            
-            # 计算3D距离
-            distance_3d = np.sqrt(horizontal_distance**2 + vertical_distance**2)
-            
-            distances_3d.append(distance_3d)
-            distances_horizontal.append(horizontal_distance)
-            distances_vertical.append(vertical_distance)
-            timestamps.append(sender_row['timestamp'])
+        merged = pd.merge_asof(
+            sender_sorted,
+            receiver_sorted,
+            on='timestamp',
+            direction='nearest',
+            tolerance=max_time_diff,
+            suffixes=('_sender', '_receiver')
+        ).dropna(subset=['east_receiver'])
         
-        if distances_3d:
+        # 在本地ENU坐标系中计算水平距离、垂直距离（高度差）和3D距离
+        distances_horizontal, distances_vertical, distances_3d = enu_separation(
+            *(merged[f'{axis}_sender'].to_numpy() for axis in ('east', 'north', 'up')),
+            *(merged[f'{axis}_receiver'].to_numpy() for axis in ('east', 'north', 'up'))
+        )
+        timestamps = merged['timestamp'].to_numpy()
+        
+        if len(distances_3d) > 0:
             self.analysis_results['inter_drone_distance'] = {
                 'timestamps': timestamps,
                 'distances_3d': distances_3d,
@@ -439,35 +1193,64 @@ class DroneCommAnalyzer:
             print(f"  平均水平距离: {self.analysis_results['inter_drone_distance']['mean_distance_horizontal']:.2f} m")
             print(f"  平均垂直距离: {self.analysis_results['inter_drone_distance']['mean_distance_vertical']:.2f} m")
             
-    def analyze_correlation(self):
-        """分析通信质量与距离的相关性"""
-        if 'inter_drone_distance' not in self.analysis_results:
-            print("缺少距离数据，无法进行相关性分析")
+    def fuse_geometry(self, max_gap=5.0):
+        """
+        将双机位置插值到每个UDP包的接收时刻和每个NEXFI采样时刻，直接附加几何列
+        
+        为receiver_data['udp']（按接收时刻）、sender_data['udp']（按发送时刻）和nexfi_data各角色
+        添加distance_3d、distance_horizontal、distance_vertical列（米），任一无人机的GPS
+        没有覆盖该时刻时为NaN。
+        
+        Args:
+            max_gap (float): GPS相邻采样间隔超过该值（秒）时视为缺失，不做插值
+        """
+        if 'sender' not in self.gps_data or 'receiver' not in self.gps_data:
+            print("GPS数据不完整，无法计算逐包几何信息")
             return
             
-        # 获取距离数据
-        distance_data = self.analysis_results['inter_drone_distance']
-        distances = distance_data['distances_3d']
-        timestamps = distance_data['timestamps']
-        
+        self.ensure_local_coordinates()
+        tracks = []
+        for role in ['sender', 'receiver']:
+            gps = self.gps_data[role].dropna(subset=['timestamp', 'east', 'north', 'up'])
+            tracks.append((gps['timestamp'].to_numpy(dtype=np.float64),
+                           [gps[axis].to_numpy() for axis in ('east', 'north', 'up')]))
+            
+        targets = []
+        if 'udp' in self.receiver_data and not self.receiver_data['udp'].empty:
+            targets.append((self.receiver_data['udp'], 'recv_timestamp'))
+        if 'udp' in self.sender_data and not self.sender_data['udp'].empty:
+            targets.append((self.sender_data['udp'], 'timestamp'))
+        for role in ['sender', 'receiver']:
+            if role in self.nexfi_data and not self.nexfi_data[role].empty:
+                targets.append((self.nexfi_data[role], 'timestamp'))
+                
+        for frame, time_column in targets:
+            query_times = frame[time_column].to_numpy(dtype=np.float64)
+            sender_position, receiver_position = [
+                interpolate_track(times, columns, query_times, max_gap) for times, columns in tracks]
+            horizontal, vertical, distance_3d = enu_separation(*sender_position, *receiver_position)
+            frame['distance_horizontal'] = horizontal
+            frame['distance_vertical'] = vertical
+            frame['distance_3d'] = distance_3d
+            
+    def analyze_correlation(self):
+        """分析通信质量与距离的相关性（使用fuse_geometry插值得到的逐包距离）"""
+        udp_data = self.receiver_data.get('udp')
+        if udp_data is not None and not udp_data.empty and 'distance_3d' not in udp_data.columns:
+            self.fuse_geometry()
+            
         correlations = {}
+        self.aligned_series = {}
         
         # 与UDP延迟的相关性
-        if 'udp' in self.receiver_data and not self.receiver_data['udp'].empty:
-            udp_data = self.receiver_data['udp']
-            aligned_delays = []
-            aligned_distances = []
-            
-            for _, udp_row in udp_data.iterrows():
-                # 找到最接近的距离数据点
-                time_diffs = [abs((ts - udp_row['recv_timestamp']).total_seconds()) for ts in timestamps]
-                if not time_diffs:
-                    continue
-                closest_idx = time_diffs.index(min(time_diffs))
-                
-                if min(time_diffs) < 5:  # 5秒内的数据才考虑
-                    aligned_delays.append(udp_row['delay'] * 1000)  # 转换为毫秒
-                    aligned_distances.append(distances[closest_idx])
+        if udp_data is not None and 'distance_3d' in udp_data.columns:
+            distances = udp_data['distance_3d'].to_numpy()
+            matched = ~np.isnan(distances)
+            
+            aligned_delays = udp_data[self._delay_column(udp_data)].to_numpy()[matched] * 1000  # 转换为毫秒
+            aligned_distances = distances[matched]
+            self.aligned_series['delay_distance'] = _build_aligned_series(
+                udp_data['recv_timestamp'].to_numpy()[matched], aligned_distances, 'delay', aligned_delays)
                     
             if len(aligned_delays) > 10:
                 correlation, p_value = stats.pearsonr(aligned_distances, aligned_delays)
@@ -480,20 +1263,15 @@ class DroneCommAnalyzer:
                 
         # 与NEXFI RSSI的相关性
         for role in ['sender', 'receiver']:
-            if role in self.nexfi_data and not self.nexfi_data[role].empty:
+            if role in self.nexfi_data and 'distance_3d' in self.nexfi_data[role].columns:
                 nexfi_data = self.nexfi_data[role]
-                aligned_rssi = []
-                aligned_distances = []
+                distances = nexfi_data['distance_3d'].to_numpy()
+                matched = ~np.isnan(distances)
                 
-                for _, nexfi_row in nexfi_data.iterrows():
-                    time_diffs = [abs((ts - nexfi_row['timestamp']).total_seconds()) for ts in timestamps]
-                    if not time_diffs:
-                        continue
-                    closest_idx = time_diffs.index(min(time_diffs))
-                    
-                    if min(time_diffs) < 10:  # 10秒内的数据才考虑
-                        aligned_rssi.append(nexfi_row['avg_rssi'])
-                        aligned_distances.append(distances[closest_idx])
+                aligned_rssi = nexfi_data['avg_rssi'].to_numpy()[matched]
+                aligned_distances = distances[matched]
+                self.aligned_series[f'rssi_distance_{role}'] = _build_aligned_series(
+                    nexfi_data['timestamp'].to_numpy()[matched], aligned_distances, 'rssi', aligned_rssi)
                         
                 if len(aligned_rssi) > 5:
                     correlation, p_value = stats.pearsonr(aligned_distances, aligned_rssi)
@@ -510,28 +1288,342 @@ class DroneCommAnalyzer:
         for key, corr in correlations.items():
             print(f"  {key}: r={corr['correlation']:.3f}, p={corr['p_value']:.3f} {'(显著)' if corr['significant'] else '(不显著)'} (n={corr['data_points']})")
             
-    def run_full_analysis(self):
-        """运行完整分析流程"""
+    def analyze_distance_bins(self, bins=10, binning='fixed'):
+        """
+        按双机3D距离分箱统计链路性能
+        
+        以接收包的逐包距离确定分箱边界，用np.digitize将UDP包和NEXFI采样归入各距离区间，
+        再用bincount和分组分位数统计延迟、丢包率和RSSI/SNR。
+        
+        Args:
+            bins (int): 分箱数量
+            binning (str): 'fixed'为等宽分箱，'quantile'为等频（分位数）分箱
+        """
+        receiver_udp = self.receiver_data.get('udp')
+        if receiver_udp is None or 'distance_3d' not in receiver_udp.columns:
+            print("缺少逐包距离数据，跳过距离分箱分析")
+            return
+            
+        recv_distances = receiver_udp['distance_3d'].to_numpy()
+        finite = recv_distances[~np.isnan(recv_distances)]
+        if len(finite) == 0:
+            print("没有可用的逐包距离，跳过距离分箱分析")
+            return
+            
+        if binning == 'quantile':
+            edges = np.unique(np.quantile(finite, np.linspace(0, 1, bins + 1)))
+        elif binning == 'fixed':
+            edges = np.linspace(finite.min(), finite.max(), bins + 1)
+        else:
+            raise ValueError(f"未知的分箱方式: {binning}")
+        if edges[-1] <= edges[0]:
+            edges = np.array([edges[0] - 0.5, edges[0] + 0.5])
+        count = len(edges) - 1
+        
+        def bin_index(distances):
+            valid = (distances >= edges[0]) & (distances <= edges[-1])
+            return np.digitize(distances[valid], edges[1:-1]), valid
+            
+        table = {
+            'bin_start': edges[:-1],
+            'bin_end': edges[1:],
+            'bin_center': (edges[:-1] + edges[1:]) / 2
+        }
+        
+        # 延迟分布
+        index, valid = bin_index(recv_distances)
+        delays = receiver_udp[self._delay_column(receiver_udp)].to_numpy(dtype=np.float64)[valid] * 1000
+        received = np.bincount(index, minlength=count)
+        p50, p95 = grouped_percentiles(index, delays, count, (0.5, 0.95))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            table['received_packets'] = received
+            table['delay_mean'] = np.bincount(index, weights=delays, minlength=count) / received
+        table['delay_p50'] = p50
+        table['delay_p95'] = p95
+        
+        # 丢包率：发送包按发送时刻的距离归箱，按序列号判断是否丢失
+        sender_udp = self.sender_data.get('udp')
+        if sender_udp is not None and 'distance_3d' in sender_udp.columns:
+            index, valid = bin_index(sender_udp['distance_3d'].to_numpy())
+            sent = np.bincount(index, minlength=count)
+            sequence_loss = self.analysis_results.get('udp', {}).get('sequence_loss')
+            if sequence_loss is not None and 'seq_num' in sender_udp.columns:
+                lost_flags = np.isin(sender_udp['seq_num'].to_numpy()[valid], sequence_loss['lost_seq_nums'])
+                lost = np.bincount(index, weights=lost_flags, minlength=count)
+            else:
+                lost = np.maximum(sent - received, 0)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                table['sent_packets'] = sent
+                table['loss_rate'] = np.where(sent > 0, lost / sent * 100, np.nan)
+                
+        # NEXFI信号质量
+        for role in ['sender', 'receiver']:
+            nexfi_data = self.nexfi_data.get(role)
+            if nexfi_data is None or 'distance_3d' not in nexfi_data.columns:
+                continue
+            index, valid = bin_index(nexfi_data['distance_3d'].to_numpy())
+            samples = np.bincount(index, minlength=count)
+            for column, name in [('avg_rssi', 'rssi'), ('avg_snr', 'snr')]:
+                if column in nexfi_data.columns:
+                    values = nexfi_data[column].to_numpy(dtype=np.float64)[valid]
+                    with np.errstate(invalid='ignore', divide='ignore'):
+                        table[f'{name}_{role}'] = np.bincount(index, weights=values, minlength=count) / samples
+                        
+        table['binning'] = binning
+        self.analysis_results['distance_bins'] = table
+        
+        print(f"\n距离分箱分析结果 ({binning}, {count}个区间):")
+        for i in range(count):
+            loss_text = f", 丢包率 {table['loss_rate'][i]:.2f}%" if 'loss_rate' in table else ''
+            print(f"  {edges[i]:.1f}-{edges[i + 1]:.1f} m: {received[i]} 包, 延迟P50 {p50[i]:.2f} ms, P95 {p95[i]:.2f} ms{loss_text}")
+            
+    def analyze_path_loss(self, two_ray=True, rssi_threshold=-90.0, reference_distance=1.0):
+        """
+        对各角色的NEXFI RSSI与逐采样3D距离拟合路径损耗模型
+        
+        Args:
+            two_ray (bool): 是否同时拟合带断点的双斜率模型
+            rssi_threshold (float): 预测通信距离所用的RSSI门限（dBm）
+            reference_distance (float): 路径损耗模型的参考距离（米）
+        """
+        path_loss_results = {}
+        for role in ['sender', 'receiver']:
+            nexfi_data = self.nexfi_data.get(role)
+            if nexfi_data is None or not {'distance_3d', 'avg_rssi'} <= set(nexfi_data.columns):
+                continue
+                
+            distances = nexfi_data['distance_3d'].to_numpy()
+            rssi = nexfi_data['avg_rssi'].to_numpy()
+            log_distance = fit_log_distance(distances, rssi, reference_distance)
+            if log_distance is None:
+                continue
+                
+            role_results = {
+                'log_distance': log_distance,
+                'predicted_range': {'log_distance': predict_range(log_distance, rssi_threshold)}
+            }
+            if two_ray:
+                two_ray_fit = fit_two_ray_breakpoint(distances, rssi, reference_distance)
+                role_results['two_ray'] = two_ray_fit
+                if two_ray_fit is not None:
+                    role_results['predicted_range']['two_ray'] = predict_range(two_ray_fit, rssi_threshold)
+            role_results['rssi_threshold'] = rssi_threshold
+            path_loss_results[role] = role_results
+            
+        if not path_loss_results:
+            print("缺少RSSI与距离数据或距离变化范围过小，跳过路径损耗拟合")
+            return
+        self.analysis_results['path_loss'] = path_loss_results
+        
+        print(f"\n路径损耗模型拟合结果:")
+        for role, result in path_loss_results.items():
+            fit = result['log_distance']
+            print(f"  {role}: RSSI(d0={reference_distance:g}m)={fit['reference_rssi']:.2f} dBm, "
+                  f"n={fit['exponent']:.2f}, RMSE={fit['residuals']['rmse']:.2f} dB, "
+                  f"{rssi_threshold:g} dBm预测距离 {result['predicted_range']['log_distance']:.1f} m")
+            two_ray_fit = result.get('two_ray')
+            if two_ray_fit is not None:
+                print(f"    双斜率: 断点 {two_ray_fit['breakpoint']:.1f} m, n1={two_ray_fit['exponent_near']:.2f}, "
+                      f"n2={two_ray_fit['exponent_far']:.2f}, RMSE={two_ray_fit['residuals']['rmse']:.2f} dB")
+                      
+    def analyze_lagged_correlation(self, grid_step=1.0, max_lag=60.0, max_gap=10.0):
+        """
+        将延迟、RSSI、SNR、链路质量和双机距离重采样到统一的均匀时间网格，
+        基于FFT计算各指标两两之间的滞后互相关，报告峰值滞后及其强度
+        
+        Args:
+            grid_step (float): 网格步长（秒）
+            max_lag (float): 搜索峰值的最大滞后（秒）
+            max_gap (float): 重采样时允许插值的最大数据空缺（秒）
+        """
+        if 'inter_drone_distance' not in self.analysis_results:
+            print("缺少距离数据，跳过滞后相关性分析")
+            return
+            
+        distance_data = self.analysis_results['inter_drone_distance']
+        distance_times = np.asarray(distance_data['timestamps'], dtype=np.float64)
+        grid = np.arange(np.floor(distance_times.min()), distance_times.max(), grid_step)
+        
+        series = {'distance': resample_to_grid(distance_times, distance_data['distances_3d'], grid, max_gap)}
+        receiver_udp = self.receiver_data.get('udp')
+        if receiver_udp is not None and not receiver_udp.empty:
+            series['delay'] = resample_to_grid(receiver_udp['recv_timestamp'].to_numpy(),
+                                               receiver_udp[self._delay_column(receiver_udp)].to_numpy() * 1000,
+                                               grid, max_gap)
+        for role in ['sender', 'receiver']:
+            nexfi_data = self.nexfi_data.get(role)
+            if nexfi_data is None or nexfi_data.empty:
+                continue
+            for column, name in [('avg_rssi', 'rssi'), ('avg_snr', 'snr'), ('link_quality', 'link_quality')]:
+                if column in nexfi_data.columns:
+                    series[f'{name}_{role}'] = resample_to_grid(nexfi_data['timestamp'].to_numpy(),
+                                                                nexfi_data[column].to_numpy(), grid, max_gap)
+                    
+        names = list(series)
+        pairs = {}
+        self.lag_correlation_curves = {}
+        for i, first in enumerate(names):
+            for second in names[i + 1:]:
+                lags, correlation = lagged_cross_correlation(series[first], series[second], grid_step, max_lag)
+                if len(correlation) == 0:
+                    continue
+                peak = np.argmax(np.abs(correlation))
+                key = f'{second}~{first}'
+                self.lag_correlation_curves[key] = (lags, correlation)
+                pairs[key] = {
+                    'peak_lag': lags[peak],
+                    'peak_correlation': correlation[peak],
+                    'zero_lag_correlation': correlation[np.argmin(np.abs(lags))]
+                }
+                
+        self.analysis_results['lagged_correlation'] = {
+            'grid_step': grid_step,
+            'max_lag': max_lag,
+            'pairs': pairs
+        }
+        
+        print(f"\n滞后相关性分析结果（正滞后表示前者落后于后者）:")
+        for key, result in pairs.items():
+            print(f"  {key}: 峰值滞后 {result['peak_lag']:+.1f} s, r={result['peak_correlation']:.3f} "
+                  f"(零滞后 r={result['zero_lag_correlation']:.3f})")
+            
+    def run_full_analysis(self, progress_callback=None, stages=None):
+        """
+        运行完整分析流程
+        
+        Args:
+            progress_callback (callable): 每个阶段开始前调用progress_callback(阶段名, 描述, 百分比)，
+                全部完成后以('done', '分析完成', 100.0)调用一次
+            stages (list): 只运行这些阶段（方法名，按ANALYSIS_STAGES中的顺序执行），默认运行全部阶段；
+                部分阶段的结果在结果存储中与完整分析分开保存
+        """
         print("开始数据分析...")
-        self.load_data()
-        self.analyze_udp_performance()
-        self.analyze_nexfi_performance()
-        self.analyze_gps_trajectory()
-        self.analyze_inter_drone_distance()
-        self.analyze_correlation()
+        selected_stages = [spec for spec in ANALYSIS_STAGES if stages is None or spec[0] in stages]
+        result_key = self.result_key(stages)
+        self.stored_result_key = result_key
+        self.restored_from_store = False
+        if result_key and self._load_stored_results(result_key, progress_callback):
+            if progress_callback:
+                progress_callback('done', '分析完成', 100.0)
+            print("\n已从结果存储加载分析结果!")
+            return
+        
+        total_weight = sum(weight for _, _, weight in selected_stages)
+        completed_weight = 0
+        for stage, description, weight in selected_stages:
+            if progress_callback:
+                progress_callback(stage, description, completed_weight * 100.0 / total_weight)
+            getattr(self, stage)()
+            completed_weight += weight
+        if result_key:
+            self.result_store.save(result_key, self.analysis_results, self._collect_stored_outputs())
+        if progress_callback:
+            progress_callback('done', '分析完成', 100.0)
         print("\n数据分析完成!")
         
-    def save_results(self, output_file):
-        """保存分析结果到JSON文件"""
-        # 处理datetime对象，转换为字符串
+    def result_key(self, stages=None):
+        """
+        计算当前数据集和分析配置在结果存储中的键，未配置结果存储时返回None
+        
+        Args:
+            stages (list): 只运行部分阶段时的阶段列表，为None时为完整分析的键
+        """
+        if self.result_store is None:
+            return None
+        config = {
+            'analysis_version': ANALYSIS_VERSION,
+            'cache_version': CACHE_VERSION,
+            'streaming': self.streaming,
+            'time_range': self.time_range,
+            'align_mode': self.align_mode,
+            'trim_policies': self.trim_policies,
+            'windows': self.windows,
+            'window_step': self.window_step
+        }
+        if stages is not None:
+            config['stages'] = sorted(stages)
+        return self.result_store.key_for(self.data_folder, config)
+        
+    def load_stored_results(self, stages=None):
+        """
+        不加载数据，直接从结果存储读取analysis_results
+        
+        优先使用完整分析的结果，其次是只运行stages时保存的结果。
+        
+        Returns:
+            dict: 分析结果，存储中没有时返回None
+        """
+        if self.result_store is None:
+            return None
+        keys = [self.result_key()]
+        if stages is not None:
+            keys.append(self.result_key(stages))
+        for key in keys:
+            results = self.result_store.load_results(key)
+            if results is not None:
+                return results
+        return None
+        
+    def _collect_stored_outputs(self):
+        """收集需要持久化的分析器属性（各数据流及分析产物）"""
+        return {name: getattr(self, name) for name in STORED_OUTPUT_ATTRIBUTES}
+        
+    def _load_stored_results(self, result_key, progress_callback=None):
+        """
+        从结果存储恢复分析结果、各数据流和分析产物，不加载原始数据，跳过所有分析阶段
+        
+        Returns:
+            bool: 是否加载成功；条目不存在或不完整时返回False，由调用方正常运行分析
+        """
+        stored = self.result_store.load(result_key)
+        if stored is None:
+            return False
+        results, outputs = stored
+        missing = [name for name in STORED_OUTPUT_ATTRIBUTES if name not in outputs]
+        if missing:
+            print(f"结果存储条目缺少 {', '.join(missing)}，重新分析")
+            return False
+        
+        print(f"结果存储命中: {result_key[:16]}")
+        if progress_callback:
+            progress_callback('load_data', '加载已保存的分析结果', 0.0)
+        for name in STORED_OUTPUT_ATTRIBUTES:
+            setattr(self, name, outputs[name])
+        self.load_timings = {}
+        self.analysis_results = results
+        self.restored_from_store = True
+        return True
+        
+    def memory_usage(self):
+        """
+        估算分析器持有的数据占用的内存（字节）
+
+        统计各数据流DataFrame、逐窗口指标表、对齐序列、抖动序列和互相关曲线，用于会话缓存的容量控制。
+        """
+        frames = [*self.sender_data.values(), *self.receiver_data.values(),
+                  *self.nexfi_data.values(), *self.gps_data.values(), *self.window_metrics.values()]
+        total = sum(int(df.memory_usage(index=True, deep=True).sum()) for df in frames if df is not None)
+        arrays = [*self.aligned_series.values(), self.jitter_series]
+        arrays += [array for curve in self.lag_correlation_curves.values() for array in curve]
+        total += sum(array.nbytes for array in arrays if array is not None)
+        return total
+        
+    def results_to_json(self, indent=2):
+        """将分析结果序列化为JSON字符串，时间戳（Unix秒）转换为中国时间字符串"""
         results_copy = self.analysis_results.copy()
         
         if 'inter_drone_distance' in results_copy:
-            timestamps = results_copy['inter_drone_distance']['timestamps']
-            results_copy['inter_drone_distance']['timestamps'] = [ts.isoformat() for ts in timestamps]
+            distance_copy = results_copy['inter_drone_distance'].copy()
+            distance_copy['timestamps'] = [
+                ts.isoformat() for ts in self.convert_to_china_time(distance_copy['timestamps'])]
+            results_copy['inter_drone_distance'] = distance_copy
             
+        return json.dumps(results_copy, ensure_ascii=False, indent=indent, default=_json_default)
+        
+    def save_results(self, output_file):
+        """保存分析结果到JSON文件"""
         with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(results_copy, f, ensure_ascii=False, indent=2)
+            f.write(self.results_to_json())
         print(f"分析结果已保存到: {output_file}")
 
 
@@ -0,0 +1,94 @@
+import numpy as np
+
+
+# WGS84椭球参数
+WGS84_A = 6378137.0
+WGS84_F = 1 / 298.257223563
+WGS84_E2 = WGS84_F * (2 - WGS84_F)
+
+
+def geodetic_to_ecef(lat, lon, alt):
+    """
+    WGS84大地坐标转换为地心地固坐标（ECEF）
+
+    Args:
+        lat, lon: 纬度、经度（度），标量或numpy数组
+        alt: 椭球高（米）
+
+    Returns:
+        tuple: (x, y, z) ECEF坐标（米）
+    """
+    lat = np.radians(np.asarray(lat, dtype=np.float64))
+    lon = np.radians(np.asarray(lon, dtype=np.float64))
+    alt = np.asarray(alt, dtype=np.float64)
+
+    sin_lat = np.sin(lat)
+    cos_lat = np.cos(lat)
+    # 卯酉圈曲率半径
+    n = WGS84_A / np.sqrt(1 - WGS84_E2 * sin_lat**2)
+    x = (n + alt) * cos_lat * np.cos(lon)
+    y = (n + alt) * cos_lat * np.sin(lon)
+    z = (n * (1 - WGS84_E2) + alt) * sin_lat
+    return x, y, z
+
+
+class LocalTangentPlane:
+    """以参考点为原点的本地东-北-天（ENU）坐标系"""
+
+    def __init__(self, ref_lat, ref_lon, ref_alt=0.0):
+        """
+        初始化本地坐标系
+
+        Args:
+            ref_lat, ref_lon (float): 参考点纬度、经度（度）
+            ref_alt (float): 参考点椭球高（米）
+        """
+        self.ref_lat = float(ref_lat)
+        self.ref_lon = float(ref_lon)
+        self.ref_alt = float(ref_alt)
+        self.origin = np.array(geodetic_to_ecef(self.ref_lat, self.ref_lon, self.ref_alt))
+
+        lat, lon = np.radians(self.ref_lat), np.radians(self.ref_lon)
+        sin_lat, cos_lat = np.sin(lat), np.cos(lat)
+        sin_lon, cos_lon = np.sin(lon), np.cos(lon)
+        # ECEF差向量到ENU的旋转矩阵（行依次为东、北、天方向）
+        self.rotation = np.array([
+            [-sin_lon, cos_lon, 0.0],
+            [-sin_lat * cos_lon, -sin_lat * sin_lon, cos_lat],
+            [cos_lat * cos_lon, cos_lat * sin_lon, sin_lat]
+        ])
+
+    @classmethod
+    def from_points(cls, lats, lons, alts=None):
+        """以一组点的均值作为参考点创建坐标系"""
+        ref_alt = np.nanmean(alts) if alts is not None and len(alts) > 0 else 0.0
+        return cls(np.nanmean(lats), np.nanmean(lons), ref_alt)
+
+    def to_enu(self, lat, lon, alt):
+        """
+        大地坐标转换为本地ENU坐标
+
+        Returns:
+            tuple: (east, north, up)坐标（米）
+        """
+        x, y, z = geodetic_to_ecef(lat, lon, alt)
+        dx, dy, dz = x - self.origin[0], y - self.origin[1], z - self.origin[2]
+        east = self.rotation[0, 0] * dx + self.rotation[0, 1] * dy
+        north = self.rotation[1, 0] * dx + self.rotation[1, 1] * dy + self.rotation[1, 2] * dz
+        up = self.rotation[2, 0] * dx + self.rotation[2, 1] * dy + self.rotation[2, 2] * dz
+        return east, north, up
+
+    def __repr__(self):
+        return f"LocalTangentPlane(ref_lat={self.ref_lat:.6f}, ref_lon={self.ref_lon:.6f}, ref_alt={self.ref_alt:.1f})"
+
+
+def enu_separation(east1, north1, up1, east2, north2, up2):
+    """
+    两组ENU坐标之间的距离分量
+
+    Returns:
+        tuple: (水平距离, 垂直距离, 3D距离)（米）
+    """
+    horizontal = np.hypot(east2 - east1, north2 - north1)
+    vertical = np.abs(up2 - up1)
+    return horizontal, vertical, np.sqrt(horizontal**2 + vertical**2)
@@ -0,0 +1,81 @@
+import numpy as np
+from scipy import signal
+
+
+def resample_to_grid(times, values, grid, max_gap=None):
+    """
+    将不规则采样的序列重采样到均匀时间网格
+
+    每个网格单元内有多个采样时取均值（如逐包延迟），没有采样的单元按相邻单元线性插值；
+    网格点距最近的有效单元超过max_gap（秒）时为NaN。
+
+    Args:
+        times: 采样时间戳数组（秒）
+        values: 采样值数组
+        grid: 均匀网格时间戳数组（秒），每个单元为[grid[i], grid[i] + step)
+        max_gap (float): 允许插值的最大空缺（秒），为None时不限制
+
+    Returns:
+        numpy数组: 网格上的序列值
+    """
+    times = np.asarray(times, dtype=np.float64)
+    values = np.asarray(values, dtype=np.float64)
+    valid = np.isfinite(times) & np.isfinite(values)
+    times, values = times[valid], values[valid]
+    result = np.full(len(grid), np.nan)
+    if len(times) == 0 or len(grid) == 0:
+        return result
+
+    step = grid[1] - grid[0] if len(grid) > 1 else 1.0
+    index = np.floor((times - grid[0]) / step).astype(np.int64)
+    inside = (index >= 0) & (index < len(grid))
+    counts = np.bincount(index[inside], minlength=len(grid))
+    sums = np.bincount(index[inside], weights=values[inside], minlength=len(grid))
+    filled = np.flatnonzero(counts)
+    if len(filled) == 0:
+        return result
+
+    result = np.interp(np.arange(len(grid)), filled, sums[filled] / counts[filled])
+    # 网格范围之外的单元不外推
+    result[:filled[0]] = np.nan
+    result[filled[-1] + 1:] = np.nan
+    if max_gap is not None:
+        right = np.clip(np.searchsorted(filled, np.arange(len(grid))), 0, len(filled) - 1)
+        left = np.clip(right - 1, 0, len(filled) - 1)
+        gap = (filled[right] - filled[left]) * step
+        result[(gap > max_gap) & (counts == 0)] = np.nan
+    return result
+
+
+def lagged_cross_correlation(x, y, step, max_lag=None):
+    """
+    基于FFT计算两个均匀采样序列的全部滞后互相关，O(N log N)
+
+    序列先标准化（NaN按均值填充），互相关除以N，零滞后处即为Pearson相关系数。
+    滞后为正表示y的变化落后于x。
+
+    Args:
+        x, y: 等长的网格序列
+        step (float): 网格步长（秒）
+        max_lag (float): 只返回|滞后| <= max_lag（秒）的部分，为None时返回全部
+
+    Returns:
+        tuple: (滞后数组（秒）, 互相关系数数组)
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    both = np.isfinite(x) & np.isfinite(y)
+    if np.count_nonzero(both) < 3 or np.nanstd(x[both]) == 0 or np.nanstd(y[both]) == 0:
+        return np.empty(0), np.empty(0)
+
+    def standardize(series):
+        standardized = (series - series[both].mean()) / series[both].std()
+        standardized[~both] = 0.0
+        return standardized
+
+    correlation = signal.correlate(standardize(y), standardize(x), mode='full', method='fft') / np.count_nonzero(both)
+    lags = signal.correlation_lags(len(y), len(x), mode='full') * step
+    if max_lag is not None:
+        keep = np.abs(lags) <= max_lag
+        lags, correlation = lags[keep], correlation[keep]
+    return lags, correlation
@@ -0,0 +1,145 @@
+import numpy as np
+
+
+# 拟合所需的最小距离跨度（log10(最大距离/最小距离)），距离变化过小时路径损耗指数没有意义
+MIN_LOG_DISTANCE_SPAN = 0.1
+
+# 预测通信距离时视为不衰减的路径损耗指数上限，及可表示的最大距离的log10
+MIN_EXPONENT = 1e-9
+MAX_LOG_RANGE = np.log10(np.finfo(np.float64).max)
+
+
+def _residual_stats(residuals, observed):
+    """拟合残差统计"""
+    total = np.sum((observed - observed.mean())**2)
+    return {
+        'rmse': float(np.sqrt(np.mean(residuals**2))),
+        'std': float(np.std(residuals)),
+        'mean_abs': float(np.mean(np.abs(residuals))),
+        'p95_abs': float(np.percentile(np.abs(residuals), 95)),
+        'r2': float(1 - np.sum(residuals**2) / total) if total > 0 else np.nan,
+        'data_points': len(residuals)
+    }
+
+
+def _prepare(distances, values, reference_distance):
+    distances = np.asarray(distances, dtype=np.float64)
+    values = np.asarray(values, dtype=np.float64)
+    valid = np.isfinite(distances) & np.isfinite(values) & (distances > 0)
+    return np.log10(distances[valid] / reference_distance), values[valid]
+
+
+def fit_log_distance(distances, rssi, reference_distance=1.0):
+    """
+    最小二乘拟合对数距离路径损耗模型 RSSI(d) = P0 - 10·n·log10(d / d0)
+
+    Args:
+        distances: 距离数组（米）
+        rssi: 对应的RSSI数组（dBm）
+        reference_distance (float): 参考距离d0（米）
+
+    Returns:
+        dict: reference_rssi（d0处的RSSI，dBm）、exponent（路径损耗指数n）及残差统计，
+            有效点少于3个或距离跨度不足MIN_LOG_DISTANCE_SPAN时返回None
+    """
+    log_distance, rssi = _prepare(distances, rssi, reference_distance)
+    if len(rssi) < 3 or np.ptp(log_distance) < MIN_LOG_DISTANCE_SPAN:
+        return None
+
+    design = np.column_stack([np.ones_like(log_distance), -10 * log_distance])
+    (reference_rssi, exponent), *_ = np.linalg.lstsq(design, rssi, rcond=None)
+    residuals = rssi - design @ np.array([reference_rssi, exponent])
+    return {
+        'model': 'log_distance',
+        'reference_distance': reference_distance,
+        'reference_rssi': float(reference_rssi),
+        'exponent': float(exponent),
+        'residuals': _residual_stats(residuals, rssi)
+    }
+
+
+def fit_two_ray_breakpoint(distances, rssi, reference_distance=1.0, candidates=30):
+    """
+    拟合带断点的双斜率（two-ray近似）模型
+
+    断点db之前指数为n1，之后为n2，曲线在断点处连续。给定断点时模型关于(P0, n1, n2)线性，
+    在距离的10%~90%分位数之间取candidates个候选断点，分别做最小二乘并取残差平方和最小者。
+
+    Returns:
+        dict: reference_rssi、exponent_near、exponent_far、breakpoint（米）及残差统计，
+            有效点少于6个或距离跨度不足时返回None
+    """
+    log_distance, rssi = _prepare(distances, rssi, reference_distance)
+    if len(rssi) < 6 or np.ptp(log_distance) < MIN_LOG_DISTANCE_SPAN:
+        return None
+
+    best = None
+    for log_breakpoint in np.unique(np.quantile(log_distance, np.linspace(0.1, 0.9, candidates))):
+        design = np.column_stack([
+            np.ones_like(log_distance),
+            -10 * np.minimum(log_distance, log_breakpoint),
+            -10 * np.maximum(log_distance - log_breakpoint, 0)
+        ])
+        coefficients, *_ = np.linalg.lstsq(design, rssi, rcond=None)
+        residuals = rssi - design @ coefficients
+        sse = np.sum(residuals**2)
+        if best is None or sse < best[0]:
+            best = (sse, log_breakpoint, coefficients, residuals)
+
+    _, log_breakpoint, (reference_rssi, exponent_near, exponent_far), residuals = best
+    return {
+        'model': 'two_ray_breakpoint',
+        'reference_distance': reference_distance,
+        'reference_rssi': float(reference_rssi),
+        'exponent_near': float(exponent_near),
+        'exponent_far': float(exponent_far),
+        'breakpoint': float(reference_distance * 10**log_breakpoint),
+        'residuals': _residual_stats(residuals, rssi)
+    }
+
+
+def predict_rssi(model, distances):
+    """用拟合的模型预测给定距离（米）处的RSSI（dBm）"""
+    log_distance = np.log10(np.asarray(distances, dtype=np.float64) / model['reference_distance'])
+    if model['model'] == 'log_distance':
+        return model['reference_rssi'] - 10 * model['exponent'] * log_distance
+    log_breakpoint = np.log10(model['breakpoint'] / model['reference_distance'])
+    return (model['reference_rssi']
+            - 10 * model['exponent_near'] * np.minimum(log_distance, log_breakpoint)
+            - 10 * model['exponent_far'] * np.maximum(log_distance - log_breakpoint, 0))
+
+
+def _range_from_exponent(base_distance, rssi_drop, exponent):
+    """
+    在对数空间计算RSSI从base_distance处再下降rssi_drop（dB）时的距离 base·10^(rssi_drop / (10·n))
+
+    指数不为正或结果超出浮点数范围（RSSI几乎不随距离衰减）时返回inf。
+    """
+    if not exponent > MIN_EXPONENT:
+        return np.inf
+    log_range = np.log10(base_distance) + rssi_drop / (10 * exponent)
+    if not log_range < MAX_LOG_RANGE:
+        return np.inf
+    with np.errstate(over='ignore'):
+        return float(np.power(10.0, log_range))
+
+
+def predict_range(model, rssi_threshold):
+    """
+    预测RSSI降至门限时的通信距离（米）
+
+    Returns:
+        float: 预测距离，模型RSSI不随距离衰减或预测距离超出浮点数范围时为inf
+    """
+    reference_distance = model['reference_distance']
+    if model['model'] == 'log_distance':
+        return _range_from_exponent(reference_distance, model['reference_rssi'] - rssi_threshold, model['exponent'])
+
+    breakpoint = model['breakpoint']
+    breakpoint_rssi = float(predict_rssi(model, breakpoint))
+    if rssi_threshold >= breakpoint_rssi:
+        if model['exponent_near'] <= 0:
+            return float(breakpoint)
+        return _range_from_exponent(reference_distance, model['reference_rssi'] - rssi_threshold,
+                                    model['exponent_near'])
+    return _range_from_exponent(breakpoint, breakpoint_rssi - rssi_threshold, model['exponent_far'])
@@ -0,0 +1,217 @@
+import numpy as np
+
+
+class _BucketStore:
+    """按对数桶索引计数的稠密存储，桶数超过上限时合并最低的桶"""
+
+    def __init__(self, max_buckets):
+        self.max_buckets = max_buckets
+        self.counts = np.zeros(0, dtype=np.int64)
+        self.offset = 0
+
+    @property
+    def total(self):
+        return int(self.counts.sum())
+
+    def add_indices(self, indices):
+        """批量累加桶索引数组"""
+        if len(indices) == 0:
+            return
+        low = self._ensure_range(int(indices.min()), int(indices.max()))
+        indices = np.maximum(indices, low)
+        self.counts += np.bincount(indices - self.offset, minlength=len(self.counts))
+
+    def merge(self, other):
+        """合并另一个存储的计数"""
+        if other.total == 0:
+            return
+        nonzero = np.flatnonzero(other.counts)
+        indices = nonzero + other.offset
+        low = self._ensure_range(int(indices[0]), int(indices[-1]))
+        indices = np.maximum(indices, low)
+        np.add.at(self.counts, indices - self.offset, other.counts[nonzero])
+
+    def _ensure_range(self, low, high):
+        """扩展存储以覆盖[low, high]，返回合并后仍保留精度的最低桶索引"""
+        if len(self.counts) > 0:
+            low = min(low, self.offset)
+            high = max(high, self.offset + len(self.counts) - 1)
+        low = max(low, high - self.max_buckets + 1)
+
+        counts = np.zeros(high - low + 1, dtype=np.int64)
+        if len(self.counts) > 0:
+            old_indices = np.arange(self.offset, self.offset + len(self.counts))
+            np.add.at(counts, np.maximum(old_indices, low) - low, self.counts)
+        self.counts = counts
+        self.offset = low
+        return low
+
+    def iter_buckets(self, reverse=False):
+        """按索引顺序遍历(桶索引, 计数)，跳过空桶"""
+        nonzero = np.flatnonzero(self.counts)
+        if reverse:
+            nonzero = nonzero[::-1]
+        for position in nonzero:
+            yield position + self.offset, int(self.counts[position])
+
+    def to_dict(self):
+        return {'offset': int(self.offset), 'counts': self.counts.tolist()}
+
+    @classmethod
+    def from_dict(cls, data, max_buckets):
+        store = cls(max_buckets)
+        store.offset = int(data['offset'])
+        store.counts = np.asarray(data['counts'], dtype=np.int64)
+        return store
+
+
+class QuantileSketch:
+    """
+    可合并的流式分位数草图（DDSketch风格的对数桶直方图）
+
+    数值按相对误差relative_accuracy映射到对数桶中计数，分位数结果的相对误差不超过该值；
+    桶数量受max_buckets限制，内存占用与数据量无关。多个数据块、文件或数据集的草图可以
+    直接merge成整体分布，无需访问原始数据。同时累积计数、均值、方差和极值。
+    """
+
+    def __init__(self, relative_accuracy=0.01, max_buckets=2048, min_value=1e-9):
+        """
+        初始化草图
+
+        Args:
+            relative_accuracy (float): 分位数的相对误差上限
+            max_buckets (int): 正、负数值各自的最大桶数量
+            min_value (float): 绝对值小于该值的数据计入零桶
+        """
+        if not 0 < relative_accuracy < 1:
+            raise ValueError("relative_accuracy必须在(0, 1)之间")
+        self.relative_accuracy = relative_accuracy
+        self.max_buckets = max_buckets
+        self.min_value = min_value
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = np.log(self.gamma)
+
+        self.positive = _BucketStore(max_buckets)
+        self.negative = _BucketStore(max_buckets)
+        self.zero_count = 0
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+
+    def add(self, values):
+        """批量加入一个数据块（忽略NaN）"""
+        values = np.asarray(values, dtype=np.float64).ravel()
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return
+
+        magnitudes = np.abs(values)
+        is_zero = magnitudes < self.min_value
+        self.zero_count += int(is_zero.sum())
+        self.positive.add_indices(self._bucket_index(values[(values > 0) & ~is_zero]))
+        self.negative.add_indices(self._bucket_index(-values[(values < 0) & ~is_zero]))
+
+        self._merge_moments(len(values), values.mean(), ((values - values.mean())**2).sum(),
+                            values.min(), values.max())
+
+    def merge(self, other):
+        """合并另一个草图（两者的相对误差参数必须一致）"""
+        if other.relative_accuracy != self.relative_accuracy or other.min_value != self.min_value:
+            raise ValueError("只能合并参数相同的分位数草图")
+        if other.count == 0:
+            return self
+        self.positive.merge(other.positive)
+        self.negative.merge(other.negative)
+        self.zero_count += other.zero_count
+        self._merge_moments(other.count, other.mean, other._m2, other.min, other.max)
+        return self
+
+    def quantile(self, q):
+        """返回分位数q（0~1）的近似值，草图为空时返回NaN"""
+        if self.count == 0:
+            return np.nan
+        if not 0 <= q <= 1:
+            raise ValueError("分位数必须在[0, 1]之间")
+        if q == 0:
+            return self.min
+        if q == 1:
+            return self.max
+
+        rank = q * (self.count - 1)
+        cumulative = 0
+        for index, count in self.negative.iter_buckets(reverse=True):
+            cumulative += count
+            if cumulative > rank:
+                return self._clamp(-self._bucket_value(index))
+        cumulative += self.zero_count
+        if cumulative > rank:
+            return self._clamp(0.0)
+        for index, count in self.positive.iter_buckets():
+            cumulative += count
+            if cumulative > rank:
+                return self._clamp(self._bucket_value(index))
+        return self.max
+
+    def quantiles(self, qs):
+        """批量计算多个分位数"""
+        return [self.quantile(q) for q in qs]
+
+    @property
+    def std(self):
+        """样本标准差（ddof=1，与pandas一致）"""
+        if self.count < 2:
+            return np.nan
+        return float(np.sqrt(self._m2 / (self.count - 1)))
+
+    def to_dict(self):
+        """序列化为可JSON化的字典"""
+        return {
+            'relative_accuracy': self.relative_accuracy,
+            'max_buckets': self.max_buckets,
+            'min_value': self.min_value,
+            'positive': self.positive.to_dict(),
+            'negative': self.negative.to_dict(),
+            'zero_count': self.zero_count,
+            'count': self.count,
+            'mean': self.mean,
+            'm2': self._m2,
+            'min': self.min if self.count else None,
+            'max': self.max if self.count else None
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """从to_dict的结果恢复草图"""
+        sketch = cls(data['relative_accuracy'], data['max_buckets'], data['min_value'])
+        sketch.positive = _BucketStore.from_dict(data['positive'], sketch.max_buckets)
+        sketch.negative = _BucketStore.from_dict(data['negative'], sketch.max_buckets)
+        sketch.zero_count = int(data['zero_count'])
+        sketch.count = int(data['count'])
+        sketch.mean = float(data['mean'])
+        sketch._m2 = float(data['m2'])
+        if sketch.count:
+            sketch.min = float(data['min'])
+            sketch.max = float(data['max'])
+        return sketch
+
+    def _bucket_index(self, magnitudes):
+        return np.ceil(np.log(magnitudes) / self._log_gamma).astype(np.int64)
+
+    def _bucket_value(self, index):
+        # 桶(gamma^(i-1), gamma^i]内相对误差最小的代表值
+        return 2 * self.gamma**index / (self.gamma + 1)
+
+    def _clamp(self, value):
+        return float(min(max(value, self.min), self.max))
+
+    def _merge_moments(self, count, mean, m2, minimum, maximum):
+        # Chan并行算法合并均值与二阶中心矩
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean += delta * count / total
+        self._m2 += m2 + delta**2 * self.count * count / total
+        self.count = total
+        self.min = min(self.min, float(minimum))
+        self.max = max(self.max, float(maximum))
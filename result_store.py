@@ -0,0 +1,140 @@
+import glob
+import hashlib
+import json
+import os
+import pickle
+import uuid
+
+
+# 计算文件内容摘要时每次读取的字节数
+DIGEST_BLOCK_SIZE = 8 * 1024 * 1024
+
+
+class ResultStore:
+    """
+    按内容寻址的分析结果持久化存储
+
+    键由数据集所有源CSV文件的内容摘要（SHA-256）和分析配置（含分析版本号）计算，输入和分析代码
+    不变时键不变，复制或改名的数据集目录也能命中。每个条目分为两个pickle文件：
+    <键>.results.pkl只包含analysis_results，用于快速读取汇总指标；<键>.outputs.pkl包含分析后的
+    各数据流、对齐序列等其余分析产物。同一个键下还可以保存附加产物（如编码好的图表），
+    文件名为<键>.<名称>.pkl。
+
+    文件先写入唯一的临时文件再用os.replace原子替换，多个进程同时读写同一个存储目录是安全的；
+    同一个键的内容相同，并发写入时保留任意一份即可。
+    """
+
+    def __init__(self, root):
+        """
+        初始化存储
+
+        Args:
+            root (str): 存储目录
+        """
+        self.root = root
+
+    def key_for(self, data_folder, config):
+        """
+        计算数据集在给定分析配置下的存储键
+
+        Args:
+            data_folder (str): 数据集目录（读取sender/、receiver/下的所有CSV文件）
+            config (dict): 影响分析结果的配置，需可JSON序列化
+
+        Returns:
+            str: 64位十六进制键
+        """
+        digest = hashlib.sha256()
+        for role in ('sender', 'receiver'):
+            for file_path in sorted(glob.glob(os.path.join(data_folder, role, '*.csv'))):
+                digest.update(f"{role}/{os.path.basename(file_path)}|{self.file_digest(file_path)}\n".encode('utf-8'))
+        digest.update(json.dumps(config, sort_keys=True, default=str).encode('utf-8'))
+        return digest.hexdigest()
+
+    def file_digest(self, file_path):
+        """
+        返回文件内容的SHA-256摘要
+
+        摘要按(绝对路径, 大小, 修改时间)记录在存储目录中，文件未变化时不再重复读取内容。
+        """
+        source = os.path.abspath(file_path)
+        stat = os.stat(source)
+        stat_key = hashlib.sha1(f"{source}|{stat.st_size}|{stat.st_mtime_ns}".encode('utf-8')).hexdigest()
+        memo_path = os.path.join(self.root, 'digests', stat_key)
+        try:
+            with open(memo_path, 'r', encoding='utf-8') as f:
+                return f.read().strip()
+        except OSError:
+            pass
+
+        digest = hashlib.sha256()
+        with open(source, 'rb') as f:
+            for block in iter(lambda: f.read(DIGEST_BLOCK_SIZE), b''):
+                digest.update(block)
+        content_digest = digest.hexdigest()
+        try:
+            self._atomic_write(memo_path, content_digest.encode('utf-8'))
+        except OSError as e:
+            print(f"写入文件摘要失败 {memo_path}: {e}")
+        return content_digest
+
+    def load_results(self, key):
+        """只读取analysis_results，条目不存在或损坏时返回None"""
+        return self._read(self._path(key, 'results'))
+
+    def load(self, key):
+        """
+        读取完整条目
+
+        Returns:
+            tuple: (analysis_results, 其余分析产物字典)，条目不存在或不完整时返回None
+        """
+        results = self._read(self._path(key, 'results'))
+        outputs = self._read(self._path(key, 'outputs'))
+        if results is None or outputs is None:
+            return None
+        return results, outputs
+
+    def save(self, key, results, outputs):
+        """写入条目（先写分析产物，再写analysis_results），写入失败时只打印错误"""
+        try:
+            self._atomic_write(self._path(key, 'outputs'), pickle.dumps(outputs, protocol=pickle.HIGHEST_PROTOCOL))
+            self._atomic_write(self._path(key, 'results'), pickle.dumps(results, protocol=pickle.HIGHEST_PROTOCOL))
+        except (OSError, pickle.PicklingError) as e:
+            print(f"写入结果存储失败 {key}: {e}")
+
+    def load_artifact(self, key, name):
+        """读取附加产物，不存在或损坏时返回None"""
+        return self._read(self._path(key, name))
+
+    def save_artifact(self, key, name, value):
+        """写入附加产物，写入失败时只打印错误"""
+        try:
+            self._atomic_write(self._path(key, name), pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+        except (OSError, pickle.PicklingError) as e:
+            print(f"写入结果存储失败 {key}.{name}: {e}")
+
+    def _path(self, key, part):
+        return os.path.join(self.root, 'objects', key[:2], f"{key}.{part}.pkl")
+
+    def _read(self, path):
+        try:
+            with open(path, 'rb') as f:
+                return pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"读取结果存储失败 {path}: {e}")
+            return None
+
+    @staticmethod
+    def _atomic_write(path, data):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}.{uuid.uuid4().hex}.tmp"
+        try:
+            with open(temp_path, 'wb') as f:
+                f.write(data)
+            os.replace(temp_path, path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
@@ -0,0 +1,94 @@
+import threading
+from collections import OrderedDict
+
+
+class SessionCache:
+    """
+    线程安全、按内存大小淘汰的LRU缓存
+
+    键为(数据集名称, 内容指纹)元组，值为任意会话对象。总大小超过max_bytes或条目数超过
+    max_entries时淘汰最久未使用的条目；刚放入的条目总是保留，即使它本身超过上限。
+    """
+
+    def __init__(self, max_bytes, max_entries=None):
+        """
+        初始化缓存
+
+        Args:
+            max_bytes (int): 所有条目估算大小之和的上限（字节）
+            max_entries (int): 条目数量上限，为None时只按大小限制
+        """
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """查找条目并标记为最近使用，未命中时返回None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value, size):
+        """放入条目（替换同名数据集的旧指纹条目），必要时淘汰最久未使用的条目"""
+        with self._lock:
+            for stale_key in [k for k in self._entries if k[0] == key[0] and k != key]:
+                self._remove(stale_key)
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, int(size))
+            self.total_bytes += int(size)
+            self._evict()
+
+    def invalidate(self, name):
+        """移除某个数据集的所有条目，返回移除的条目数"""
+        with self._lock:
+            stale_keys = [key for key in self._entries if key[0] == name]
+            for key in stale_keys:
+                self._remove(key)
+            return len(stale_keys)
+
+    def clear(self):
+        """清空缓存（保留命中统计）"""
+        with self._lock:
+            self._entries.clear()
+            self.total_bytes = 0
+
+    def stats(self):
+        """返回缓存占用和命中统计"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'total_bytes': self.total_bytes,
+                'max_bytes': self.max_bytes,
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else None,
+                'evictions': self.evictions,
+                'datasets': [
+                    {'name': key[0], 'fingerprint': key[1], 'size_bytes': size}
+                    for key, (_, size) in reversed(self._entries.items())
+                ]
+            }
+
+    def _remove(self, key):
+        _, size = self._entries.pop(key)
+        self.total_bytes -= size
+
+    def _evict(self):
+        while len(self._entries) > 1 and (
+                self.total_bytes > self.max_bytes or
+                (self.max_entries is not None and len(self._entries) > self.max_entries)):
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
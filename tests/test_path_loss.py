@@ -0,0 +1,30 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from path_loss import fit_log_distance, fit_two_ray_breakpoint, predict_range
+
+
+def test_predict_range_flat_rssi_does_not_overflow():
+    distances = np.linspace(100, 3000, 500)
+    for seed in range(50):
+        rssi = -50 + np.random.default_rng(seed).normal(0, 5, len(distances))
+        for model in (fit_log_distance(distances, rssi), fit_two_ray_breakpoint(distances, rssi)):
+            predicted = predict_range(model, -90.0)
+            assert predicted > 0 and not np.isnan(predicted)
+
+
+def test_predict_range_small_exponent_is_inf():
+    model = {'model': 'log_distance', 'reference_distance': 1.0, 'reference_rssi': -50.0, 'exponent': 1e-3}
+    assert predict_range(model, -90.0) == np.inf
+    model['exponent'] = 0.0
+    assert predict_range(model, -90.0) == np.inf
+
+
+def test_predict_range_log_distance():
+    distances = np.geomspace(10, 1000, 200)
+    model = fit_log_distance(distances, -40 - 20 * np.log10(distances))
+    assert np.isclose(predict_range(model, -90.0), 10**2.5)
@@ -0,0 +1,61 @@
+import io
+import os
+import sys
+import zipfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import web_app
+
+
+def make_dataset_zip(files):
+    """在内存中构造数据集ZIP文件"""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as zipf:
+        for name, content in files.items():
+            zipf.writestr(name, content)
+    buffer.seek(0)
+    return buffer
+
+
+def upload(client, buffer, filename='flight.zip'):
+    return client.post('/upload', data={'dataset_file': (buffer, filename)},
+                       content_type='multipart/form-data')
+
+
+def setup_folders(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.makedirs('uploads')
+    monkeypatch.setitem(web_app.app.config, 'UPLOAD_FOLDER', 'uploads')
+    return web_app.app.test_client()
+
+
+def test_upload_valid_dataset(tmp_path, monkeypatch):
+    client = setup_folders(tmp_path, monkeypatch)
+    buffer = make_dataset_zip({
+        'flight1/sender/udp_sender_20240101.csv': 'timestamp,seq_num\n',
+        'flight1/receiver/udp_receiver_20240101.csv': 'timestamp,seq_num\n',
+    })
+
+    response = upload(client, buffer)
+
+    assert response.status_code == 200
+    assert response.get_json()['dataset_name'] == 'flight1'
+    assert os.path.isfile(os.path.join('data', 'flight1', 'sender', 'udp_sender_20240101.csv'))
+    assert os.listdir('uploads') == []
+    assert any(dataset['name'] == 'flight1' for dataset in web_app.available_datasets)
+
+
+def test_upload_rejects_incomplete_dataset(tmp_path, monkeypatch):
+    client = setup_folders(tmp_path, monkeypatch)
+    buffer = make_dataset_zip({
+        'flight2/sender/udp_sender_20240101.csv': 'timestamp,seq_num\n',
+        'flight2/receiver/gps_logger_20240101.csv': 'timestamp\n',
+    })
+
+    response = upload(client, buffer)
+
+    assert response.status_code == 400
+    assert 'udp_receiver' in response.get_json()['error']
+    assert not os.path.exists(os.path.join('data', 'flight2'))
+    assert os.listdir('uploads') == []
@@ -7,6 +7,8 @@ import numpy as np
 from datetime import datetime
 import json
 
+from drone_communication_analyzer import compute_trajectory_segments
+
 
 class DroneCommVisualizer:
     def __init__(self, analyzer):
@@ -37,7 +39,7 @@ class DroneCommVisualizer:
         # 延迟时间序列
         fig.add_trace(
             go.Scatter(
-                x=receiver_udp['recv_timestamp'],
+                x=self.analyzer.convert_to_china_time(receiver_udp['recv_timestamp']),
                 y=receiver_udp['delay'] * 1000,
                 mode='lines+markers',
                 name='UDP延迟',
@@ -47,6 +49,20 @@ class DroneCommVisualizer:
             row=1, col=1
         )
         
+        # RFC 3550平滑抖动
+        jitter_series = getattr(self.analyzer, 'jitter_series', None)
+        if jitter_series is not None and len(jitter_series) > 0:
+            fig.add_trace(
+                go.Scatter(
+                    x=self.analyzer.convert_to_china_time(jitter_series['timestamp']),
+                    y=jitter_series['jitter'] * 1000,
+                    mode='lines',
+                    name='抖动 (RFC 3550)',
+                    line=dict(color='orange', width=1)
+                ),
+                row=1, col=1
+            )
+        
         # 延迟分布直方图
         fig.add_trace(
             go.Histogram(
@@ -120,10 +136,12 @@ class DroneCommVisualizer:
             if data.empty:
                 continue
                 
+            times = self.analyzer.convert_to_china_time(data['timestamp'])
+            
             # RSSI
             fig.add_trace(
                 go.Scatter(
-                    x=data['timestamp'],
+                    x=times,
                     y=data['avg_rssi'],
                     mode='lines+markers',
                     name=f'{role} RSSI',
@@ -136,7 +154,7 @@ class DroneCommVisualizer:
             # SNR
             fig.add_trace(
                 go.Scatter(
-                    x=data['timestamp'],
+                    x=times,
                     y=data['avg_snr'],
                     mode='lines+markers',
                     name=f'{role} SNR',
@@ -149,7 +167,7 @@ class DroneCommVisualizer:
             # 吞吐量
             fig.add_trace(
                 go.Scatter(
-                    x=data['timestamp'],
+                    x=times,
                     y=data['throughput'],
                     mode='lines+markers',
                     name=f'{role} 吞吐量',
@@ -162,7 +180,7 @@ class DroneCommVisualizer:
             # 链路质量
             fig.add_trace(
                 go.Scatter(
-                    x=data['timestamp'],
+                    x=times,
                     y=data['link_quality'],
                     mode='lines+markers',
                     name=f'{role} 链路质量',
@@ -201,36 +219,10 @@ class DroneCommVisualizer:
         
         colors = {'sender': 'blue', 'receiver': 'red'}
         
-        # 找到所有GPS点的中心作为参考点
-        all_lats = []
-        all_lons = []
-        for role, data in self.analyzer.gps_data.items():
-            if not data.empty:
-                all_lats.extend(data['latitude'].tolist())
-                all_lons.extend(data['longitude'].tolist())
-        
-        if not all_lats:
+        # 转换为数据集共享的本地ENU坐标（参考点为全部GPS点的中心）
+        self.analyzer.ensure_local_coordinates()
+        if self.analyzer.get_local_frame() is None:
             return
-            
-        # 使用中心点作为参考
-        ref_lat = np.mean(all_lats)
-        ref_lon = np.mean(all_lons)
-        
-        # 将经纬度转换为相对米坐标的函数
-        def latlon_to_meters(lat, lon, ref_lat, ref_lon):
-            """将经纬度转换为相对于参考点的米坐标"""
-            from math import radians, cos
-            
-            # 地球半径（米）
-            R = 6371000
-            
-            # 纬度差转换为米
-            y = (lat - ref_lat) * (np.pi / 180) * R
-            
-            # 经度差转换为米（考虑纬度的影响）
-            x = (lon - ref_lon) * (np.pi / 180) * R * cos(radians(ref_lat))
-            
-            return x, y
         
         for role, data in self.analyzer.gps_data.items():
             if data.empty:
@@ -239,13 +231,8 @@ class DroneCommVisualizer:
             # 按时间排序
             data_sorted = data.sort_values('timestamp')
             
-            # 转换经纬度为相对米坐标
-            x_coords = []
-            y_coords = []
-            for _, row in data_sorted.iterrows():
-                x, y = latlon_to_meters(row['latitude'], row['longitude'], ref_lat, ref_lon)
-                x_coords.append(x)
-                y_coords.append(y)
+            x_coords = data_sorted['east'].to_numpy()
+            y_coords = data_sorted['north'].to_numpy()
             
             # 使用高度数据
             z_coords = data_sorted['altitude'].tolist()
@@ -276,7 +263,7 @@ class DroneCommVisualizer:
                         colorbar=dict(title=f"{role} 时间进程")
                     ),
                     text=[f"时间: {t.strftime('%H:%M:%S')}<br>高度: {h:.1f}m<br>经度: {lon:.6f}<br>纬度: {lat:.6f}" 
-                          for t, h, lat, lon in zip(data_sorted['timestamp'], z_coords, 
+                          for t, h, lat, lon in zip(self.analyzer.convert_to_china_time(data_sorted['timestamp']), z_coords, 
                                                    data_sorted['latitude'], data_sorted['longitude'])],
                     hovertemplate="%{text}<extra></extra>"
                 )
@@ -332,19 +319,20 @@ class DroneCommVisualizer:
             
             # 使用local_z字段，这是相对高度变化
             alt_data = data_sorted['local_z']
+            alt_times = self.analyzer.convert_to_china_time(data_sorted['timestamp'])
             alt_range = alt_data.max() - alt_data.min()
             print(f"{role} 高度(local_z)变化范围: {alt_range:.2f} m")
             
             fig_alt.add_trace(
                 go.Scatter(
-                    x=data_sorted['timestamp'],
+                    x=alt_times,
                     y=alt_data,
                     mode='lines+markers',
                     name=f'{role} 高度',
                     line=dict(color=colors[role], width=2),
                     marker=dict(size=4),
                     text=[f"时间: {t.strftime('%H:%M:%S')}<br>高度: {h:.2f}m" 
-                          for t, h in zip(data_sorted['timestamp'], alt_data)],
+                          for t, h in zip(alt_times, alt_data)],
                     hovertemplate="%{text}<extra></extra>"
                 )
             )
@@ -366,35 +354,22 @@ class DroneCommVisualizer:
             if data.empty or len(data) < 2:
                 continue
                 
-            data_sorted = data.sort_values('timestamp')
-            
-            # 计算速度
-            speeds = []
-            timestamps = []
-            
-            for i in range(1, len(data_sorted)):
-                prev_row = data_sorted.iloc[i-1]
-                curr_row = data_sorted.iloc[i]
-                
-                # 计算3D距离
-                distance = np.sqrt(
-                    (curr_row['local_x'] - prev_row['local_x'])**2 +
-                    (curr_row['local_y'] - prev_row['local_y'])**2 +
-                    (curr_row['local_z'] - prev_row['local_z'])**2
-                )
-                
-                # 计算时间差
-                time_diff = (curr_row['timestamp'] - prev_row['timestamp']).total_seconds()
-                
-                if time_diff > 0:
-                    speed = distance / time_diff
-                    speeds.append(speed)
-                    timestamps.append(curr_row['timestamp'])
+            # 复用analyze_gps_trajectory生成的速度列，未分析时现场计算
+            if 'speed' in data.columns:
+                speed_column = data['speed'].to_numpy()
+            else:
+                speed_column = compute_trajectory_segments(
+                    data['timestamp'].to_numpy(), data['local_x'].to_numpy(),
+                    data['local_y'].to_numpy(), data['local_z'].to_numpy()
+                )['speed']
+            valid = ~np.isnan(speed_column)
+            speeds = speed_column[valid]
+            timestamps = data['timestamp'].to_numpy()[valid]
             
-            if speeds:
+            if len(speeds) > 0:
                 fig_speed.add_trace(
                     go.Scatter(
-                        x=timestamps,
+                        x=self.analyzer.convert_to_china_time(timestamps),
                         y=speeds,
                         mode='lines+markers',
                         name=f'{role} 速度',
@@ -419,7 +394,7 @@ class DroneCommVisualizer:
             return
             
         distance_data = self.analyzer.analysis_results['inter_drone_distance']
-        timestamps = distance_data['timestamps']
+        timestamps = self.analyzer.convert_to_china_time(distance_data['timestamps'])
         distances_3d = distance_data['distances_3d']
         distances_horizontal = distance_data['distances_horizontal']
         distances_vertical = distance_data['distances_vertical']
@@ -558,91 +533,63 @@ class DroneCommVisualizer:
         if not correlations:
             return
             
+        # 直接使用分析器中已对齐的序列绘图
+        aligned_series = self.analyzer.aligned_series
+        
         # 如果有延迟-距离相关性数据，创建散点图
-        if 'delay_distance' in correlations:
-            # 重新获取对齐的数据进行绘图
-            if 'inter_drone_distance' in self.analyzer.analysis_results and 'udp' in self.analyzer.receiver_data:
-                distance_data = self.analyzer.analysis_results['inter_drone_distance']
-                distances = distance_data['distances_3d']
-                timestamps = distance_data['timestamps']
-                udp_data = self.analyzer.receiver_data['udp']
+        if 'delay_distance' in correlations and 'delay_distance' in aligned_series:
+            aligned_distances = aligned_series['delay_distance']['distance']
+            aligned_delays = aligned_series['delay_distance']['delay']
+            
+            if len(aligned_delays) > 0:
+                fig_corr = go.Figure()
                 
-                aligned_delays = []
-                aligned_distances = []
+                fig_corr.add_trace(
+                    go.Scatter(
+                        x=aligned_distances,
+                        y=aligned_delays,
+                        mode='markers',
+                        name='延迟vs距离',
+                        marker=dict(color='blue', size=6, opacity=0.6)
+                    )
+                )
                 
-                for _, udp_row in udp_data.iterrows():
-                    time_diffs = [abs((ts - udp_row['recv_timestamp']).total_seconds()) for ts in timestamps]
-                    if not time_diffs:
-                        continue
-                    closest_idx = time_diffs.index(min(time_diffs))
-                    
-                    if min(time_diffs) < 5:
-                        aligned_delays.append(udp_row['delay'] * 1000)
-                        aligned_distances.append(distances[closest_idx])
+                # 添加趋势线
+                z = np.polyfit(aligned_distances.astype(np.float64), aligned_delays.astype(np.float64), 1)
+                p = np.poly1d(z)
+                x_trend = np.linspace(aligned_distances.min(), aligned_distances.max(), 100)
+                y_trend = p(x_trend)
                 
-                if aligned_delays:
-                    fig_corr = go.Figure()
-                    
-                    fig_corr.add_trace(
-                        go.Scatter(
-                            x=aligned_distances,
-                            y=aligned_delays,
-                            mode='markers',
-                            name='延迟vs距离',
-                            marker=dict(color='blue', size=6, opacity=0.6)
-                        )
-                    )
-                    
-                    # 添加趋势线
-                    z = np.polyfit(aligned_distances, aligned_delays, 1)
-                    p = np.poly1d(z)
-                    x_trend = np.linspace(min(aligned_distances), max(aligned_distances), 100)
-                    y_trend = p(x_trend)
-                    
-                    fig_corr.add_trace(
-                        go.Scatter(
-                            x=x_trend,
-                            y=y_trend,
-                            mode='lines',
-                            name='趋势线',
-                            line=dict(color='red', width=2)
-                        )
-                    )
-                    
-                    corr_val = correlations['delay_distance']['correlation']
-                    p_val = correlations['delay_distance']['p_value']
-                    
-                    fig_corr.update_layout(
-                        title=f'UDP延迟与双机距离相关性分析<br>相关系数: r={corr_val:.3f}, p={p_val:.3f}',
-                        xaxis_title='距离 (m)',
-                        yaxis_title='延迟 (ms)',
-                        height=500
+                fig_corr.add_trace(
+                    go.Scatter(
+                        x=x_trend,
+                        y=y_trend,
+                        mode='lines',
+                        name='趋势线',
+                        line=dict(color='red', width=2)
                     )
-                    
-                    self.figures['delay_distance_correlation'] = fig_corr
+                )
+                
+                corr_val = correlations['delay_distance']['correlation']
+                p_val = correlations['delay_distance']['p_value']
+                
+                fig_corr.update_layout(
+                    title=f'UDP延迟与双机距离相关性分析<br>相关系数: r={corr_val:.3f}, p={p_val:.3f}',
+                    xaxis_title='距离 (m)',
+                    yaxis_title='延迟 (ms)',
+                    height=500
+                )
+                
+                self.figures['delay_distance_correlation'] = fig_corr
         
         # RSSI-距离相关性
         for role in ['sender', 'receiver']:
-            if f'rssi_distance_{role}' in correlations and role in self.analyzer.nexfi_data:
-                distance_data = self.analyzer.analysis_results['inter_drone_distance']
-                distances = distance_data['distances_3d']
-                timestamps = distance_data['timestamps']
-                nexfi_data = self.analyzer.nexfi_data[role]
-                
-                aligned_rssi = []
-                aligned_distances = []
+            key = f'rssi_distance_{role}'
+            if key in correlations and key in aligned_series:
+                aligned_distances = aligned_series[key]['distance']
+                aligned_rssi = aligned_series[key]['rssi']
                 
-                for _, nexfi_row in nexfi_data.iterrows():
-                    time_diffs = [abs((ts - nexfi_row['timestamp']).total_seconds()) for ts in timestamps]
-                    if not time_diffs:
-                        continue
-                    closest_idx = time_diffs.index(min(time_diffs))
-                    
-                    if min(time_diffs) < 10:
-                        aligned_rssi.append(nexfi_row['avg_rssi'])
-                        aligned_distances.append(distances[closest_idx])
-                
-                if aligned_rssi:
+                if len(aligned_rssi) > 0:
                     fig_rssi_corr = go.Figure()
                     
                     fig_rssi_corr.add_trace(
@@ -656,9 +603,9 @@ class DroneCommVisualizer:
                     )
                     
                     # 添加趋势线
-                    z = np.polyfit(aligned_distances, aligned_rssi, 1)
+                    z = np.polyfit(aligned_distances.astype(np.float64), aligned_rssi.astype(np.float64), 1)
                     p = np.poly1d(z)
-                    x_trend = np.linspace(min(aligned_distances), max(aligned_distances), 100)
+                    x_trend = np.linspace(aligned_distances.min(), aligned_distances.max(), 100)
                     y_trend = p(x_trend)
                     
                     fig_rssi_corr.add_trace(
@@ -683,6 +630,57 @@ class DroneCommVisualizer:
                     
                     self.figures[f'rssi_distance_correlation_{role}'] = fig_rssi_corr
         
+    def create_distance_bin_plots(self):
+        """创建按距离分箱的链路性能曲线"""
+        if 'distance_bins' not in self.analyzer.analysis_results:
+            return
+            
+        table = self.analyzer.analysis_results['distance_bins']
+        centers = table['bin_center']
+        
+        fig = make_subplots(
+            rows=2, cols=2,
+            subplot_titles=('延迟 vs 距离', '丢包率 vs 距离', 'RSSI vs 距离', 'SNR vs 距离')
+        )
+        
+        for key, name, color in [('delay_p50', '延迟P50', 'blue'), ('delay_p95', '延迟P95', 'red')]:
+            fig.add_trace(
+                go.Scatter(x=centers, y=table[key], mode='lines+markers', name=name,
+                           line=dict(color=color, width=2)),
+                row=1, col=1
+            )
+            
+        if 'loss_rate' in table:
+            fig.add_trace(
+                go.Bar(x=centers, y=table['loss_rate'], name='丢包率', marker_color='orange'),
+                row=1, col=2
+            )
+            
+        colors = {'sender': 'blue', 'receiver': 'red'}
+        for role in ['sender', 'receiver']:
+            for metric, col in [('rssi', 1), ('snr', 2)]:
+                key = f'{metric}_{role}'
+                if key in table:
+                    fig.add_trace(
+                        go.Scatter(x=centers, y=table[key], mode='lines+markers',
+                                   name=f'{role} {metric.upper()}', line=dict(color=colors[role], width=2)),
+                        row=2, col=col
+                    )
+                    
+        fig.update_layout(
+            title=f"链路性能随距离变化（{'等频' if table['binning'] == 'quantile' else '等宽'}分箱）",
+            height=800,
+            showlegend=True
+        )
+        for row, col in [(1, 1), (1, 2), (2, 1), (2, 2)]:
+            fig.update_xaxes(title_text="距离 (m)", row=row, col=col)
+        fig.update_yaxes(title_text="延迟 (ms)", row=1, col=1)
+        fig.update_yaxes(title_text="丢包率 (%)", row=1, col=2)
+        fig.update_yaxes(title_text="RSSI (dBm)", row=2, col=1)
+        fig.update_yaxes(title_text="SNR (dB)", row=2, col=2)
+        
+        self.figures['distance_bins'] = fig
+        
     def create_all_plots(self):
         """创建所有图表"""
         print("生成可视化图表...")
@@ -691,6 +689,7 @@ class DroneCommVisualizer:
         self.create_gps_trajectory_plots()
         self.create_distance_analysis_plots()
         self.create_correlation_plots()
+        self.create_distance_bin_plots()
         print(f"已生成 {len(self.figures)} 个图表")
         
     def save_plots_as_html(self, output_dir="plots"):
@@ -703,12 +702,21 @@ class DroneCommVisualizer:
             pyo.plot(fig, filename=output_file, auto_open=False)
             print(f"图表已保存: {output_file}")
             
+    def encode_figures(self):
+        """
+        逐个将图表序列化为UTF-8 JSON字节串，用于Web展示
+        
+        结果不在可视化器中缓存，调用方按需拼接或压缩，避免同时持有所有图表的未压缩JSON。
+        
+        Yields:
+            tuple: (图表名称, JSON字节串)
+        """
+        for name, fig in self.figures.items():
+            yield name, fig.to_json().encode('utf-8')
+        
     def get_figures_json(self):
         """将图表转换为JSON格式，用于Web展示"""
-        figures_json = {}
-        for name, fig in self.figures.items():
-            figures_json[name] = fig.to_json()
-        return figures_json
+        return {name: blob.decode('utf-8') for name, blob in self.encode_figures()}
 
 
 def create_summary_dashboard(analyzer):
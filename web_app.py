@@ -3,8 +3,7 @@ import os
 import json
 import glob
 from datetime import datetime
-from drone_communication_analyzer import DroneCommAnalyzer
-from visualization import DroneCommVisualizer, create_summary_dashboard
+from drone_communication_analyzer import dataset_fingerprint, extract_comparison_metrics
 import plotly
 import plotly.utils
 import io
@@ -13,7 +12,9 @@ import tempfile
 import pandas as pd
 import shutil
 from werkzeug.utils import secure_filename
-import math
+from session_cache import SessionCache
+from analysis_jobs import AnalysisJobQueue
+from result_store import ResultStore
 
 # 设置环境变量（用于生产部署）
 os.environ.setdefault('FLASK_ENV', 'production')
@@ -21,18 +22,41 @@ os.environ.setdefault('FLASK_ENV', 'production')
 app = Flask(__name__)
 app.config['MAX_CONTENT_LENGTH'] = 500 * 1024 * 1024  # 500MB max file size
 app.config['UPLOAD_FOLDER'] = 'uploads'
+# 分析会话缓存的内存上限和条目数上限
+app.config['SESSION_CACHE_MAX_BYTES'] = int(os.environ.get('SESSION_CACHE_MAX_MB', 1024)) * 1024 * 1024
+app.config['SESSION_CACHE_MAX_ENTRIES'] = int(os.environ.get('SESSION_CACHE_MAX_ENTRIES', 8))
+# 后台分析进程数（同时用于并行计算数据集对比指标）
+app.config['ANALYSIS_WORKERS'] = int(os.environ.get('ANALYSIS_WORKERS', min(4, os.cpu_count() or 1)))
+# 分析结果持久化存储目录（可由多个服务进程共享）
+app.config['RESULT_STORE_DIR'] = os.environ.get('RESULT_STORE_DIR', '.result_store')
 
 # 确保上传目录存在
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 
-# 全局变量存储当前分析器和可视化器
-current_analyzer = None
-current_visualizer = None
+# 按(数据集名称, 内容指纹)缓存的分析会话，多个用户可以同时查看不同的数据集
+session_cache = SessionCache(app.config['SESSION_CACHE_MAX_BYTES'], app.config['SESSION_CACHE_MAX_ENTRIES'])
+# 按源文件内容和分析版本寻址的分析结果存储，服务重启后无需重新计算
+result_store = ResultStore(app.config['RESULT_STORE_DIR'])
 available_datasets = []
 
+
+def cache_session(session):
+    """后台分析完成后放入会话缓存（分析期间数据集已被删除时丢弃）"""
+    if os.path.exists(session.dataset_path):
+        session_cache.put((session.dataset_name, session.fingerprint), session, session.size_bytes)
+
+
+# 后台分析任务队列，分析在独立进程中运行，完成后放入会话缓存
+analysis_jobs = AnalysisJobQueue(max_workers=app.config['ANALYSIS_WORKERS'], on_complete=cache_session,
+                                 result_store=result_store)
+
+
 # 添加缓存控制装饰器
 def add_cache_control(response):
-    """添加缓存控制头"""
+    """添加缓存控制头；带内容ETag的响应保留ETag，只要求客户端每次重新验证"""
+    if response.headers.get('ETag'):
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
     response.headers['Cache-Control'] = 'no-cache, no-store, must-revalidate, max-age=0'
     response.headers['Pragma'] = 'no-cache'
     response.headers['Expires'] = '0'
@@ -48,7 +72,8 @@ def after_request(response):
 def scan_available_datasets():
     """扫描可用的数据集"""
     global available_datasets
-    available_datasets = []
+    # 先在局部列表中扫描，完成后整体替换，避免并发请求读到扫描到一半的列表
+    datasets = []
     
     # 首先检查根目录下的数据集文件夹
     for item in os.listdir('.'):
@@ -74,7 +99,7 @@ def scan_available_datasets():
                     'creation_time': datetime.fromtimestamp(os.path.getctime(item_path)).strftime('%Y-%m-%d %H:%M:%S'),
                     'source': 'local'
                 }
-                available_datasets.append(dataset_info)
+                datasets.append(dataset_info)
     
     # 然后检查data目录下的数据集
     data_dir = 'data'
@@ -102,10 +127,84 @@ def scan_available_datasets():
                         'creation_time': datetime.fromtimestamp(os.path.getctime(item_path)).strftime('%Y-%m-%d %H:%M:%S'),
                         'source': 'data'
                     }
-                    available_datasets.append(dataset_info)
+                    datasets.append(dataset_info)
     
     # 按创建时间排序
-    available_datasets.sort(key=lambda x: x['creation_time'], reverse=True)
+    datasets.sort(key=lambda x: x['creation_time'], reverse=True)
+    available_datasets = datasets
+
+
+def find_dataset_path(dataset_name):
+    """查找数据集路径，未找到时重新扫描一次；数据集不存在时返回None"""
+    for attempt in range(2):
+        for dataset in available_datasets:
+            if dataset['name'] == dataset_name and os.path.exists(dataset['path']):
+                return dataset['path']
+        if attempt == 0:
+            scan_available_datasets()
+    return None
+
+
+def get_session(dataset_name, force=False):
+    """
+    获取数据集的分析会话，未缓存时提交后台分析任务
+    
+    同一数据集（内容未变化）此前分析失败时不再自动重新分析，返回失败任务的ID。
+    
+    Args:
+        dataset_name (str): 数据集名称
+        force (bool): 丢弃已缓存的会话和失败记录，重新分析
+        
+    Returns:
+        tuple: (会话, 任务ID)；会话已缓存时任务ID为None，未缓存时会话为None，
+            数据集不存在时均为None
+    """
+    dataset_path = find_dataset_path(dataset_name)
+    if dataset_path is None:
+        return None, None
+    
+    fingerprint = dataset_fingerprint(dataset_path)
+    if force:
+        session_cache.invalidate(dataset_name)
+    else:
+        session = session_cache.get((dataset_name, fingerprint))
+        if session is not None:
+            return session, None
+    return None, analysis_jobs.submit(dataset_name, dataset_path, fingerprint, retry=force)
+
+
+def pending_response(dataset_name, job_id):
+    """会话未就绪时的响应：数据集不存在返回404，分析失败返回500，分析进行中返回202及任务ID"""
+    if job_id is None:
+        return jsonify({'error': f'数据集 {dataset_name} 不存在'}), 404
+    job = analysis_jobs.status(job_id)
+    if job is not None and job['status'] == 'failed':
+        return jsonify({
+            'error': f"数据集 {dataset_name} 分析失败: {job['error']}，请重新分析",
+            'job_id': job_id,
+            'status_url': url_for('job_status', job_id=job_id)
+        }), 500
+    return jsonify({
+        'error': f'数据集 {dataset_name} 正在分析中',
+        'job_id': job_id,
+        'status_url': url_for('job_status', job_id=job_id)
+    }), 202
+
+
+def session_from_request():
+    """
+    根据请求参数dataset获取分析会话
+    
+    Returns:
+        tuple: (会话, 错误响应)，成功时错误响应为None
+    """
+    dataset_name = request.args.get('dataset')
+    if not dataset_name:
+        return None, (jsonify({'error': '缺少dataset参数'}), 400)
+    session, job_id = get_session(dataset_name)
+    if session is None:
+        return None, pending_response(dataset_name, job_id)
+    return session, None
 
 
 def validate_dataset_structure(dataset_path):
@@ -240,66 +339,37 @@ def upload_dataset():
 
 @app.route('/analyze/<dataset_name>')
 def analyze_dataset(dataset_name):
-    """分析指定数据集"""
-    global current_analyzer, current_visualizer
-    
-    # 强制清理旧的分析结果
-    current_analyzer = None
-    current_visualizer = None
-    
-    # 查找数据集路径
-    dataset_path = None
-    for dataset in available_datasets:
-        if dataset['name'] == dataset_name:
-            dataset_path = dataset['path']
-            break
+    """分析指定数据集：提交后台分析任务（已缓存的会话直接复用）后跳转到仪表板"""
+    force_reanalyze = request.args.get('force', 'false').lower() == 'true'
     
-    if not dataset_path or not os.path.exists(dataset_path):
+    session, job_id = get_session(dataset_name, force=force_reanalyze)
+    if session is None and job_id is None:
         return jsonify({'error': f'数据集 {dataset_name} 不存在'}), 404
     
-    try:
-        print(f"开始分析数据集: {dataset_name}")
-        print(f"数据集路径: {dataset_path}")
-        
-        # 创建分析器并运行分析
-        current_analyzer = DroneCommAnalyzer(dataset_path)
-        current_analyzer.run_full_analysis()
-        
-        print("数据分析完成，开始生成可视化...")
-        
-        # 创建可视化器并生成图表
-        current_visualizer = DroneCommVisualizer(current_analyzer)
-        current_visualizer.create_all_plots()
-        
-        print("可视化生成完成")
-        
-        # 创建响应并添加缓存控制
-        response = make_response(redirect(url_for('dashboard', dataset_name=dataset_name)))
-        response.headers['Cache-Control'] = 'no-cache, no-store, must-revalidate'
-        response.headers['Pragma'] = 'no-cache'
-        response.headers['Expires'] = '0'
-        
-        return response
-        
-    except Exception as e:
-        print(f"分析错误: {str(e)}")
-        import traceback
-        traceback.print_exc()
-        return jsonify({'error': f'分析失败: {str(e)}'}), 500
+    # 创建响应并添加缓存控制
+    response = make_response(redirect(url_for('dashboard', dataset_name=dataset_name)))
+    response.headers['Cache-Control'] = 'no-cache, no-store, must-revalidate'
+    response.headers['Pragma'] = 'no-cache'
+    response.headers['Expires'] = '0'
+    
+    return response
 
 
 @app.route('/dashboard/<dataset_name>')
 def dashboard(dataset_name):
-    """显示分析仪表板"""
+    """显示分析仪表板，分析未完成时页面轮询任务进度"""
     # 检查是否需要重新分析
     force_reanalyze = request.args.get('force', 'false').lower() == 'true'
     
-    if current_analyzer is None or force_reanalyze:
-        print(f"需要重新分析数据集: {dataset_name}")
-        return redirect(url_for('analyze_dataset', dataset_name=dataset_name))
+    if force_reanalyze:
+        return redirect(url_for('analyze_dataset', dataset_name=dataset_name, force='true'))
+    
+    session, job_id = get_session(dataset_name)
+    if session is None and job_id is None:
+        return jsonify({'error': f'数据集 {dataset_name} 不存在'}), 404
     
     # 创建响应并添加缓存控制
-    response = make_response(render_template('dashboard.html', dataset_name=dataset_name))
+    response = make_response(render_template('dashboard.html', dataset_name=dataset_name, job_id=job_id))
     response.headers['Cache-Control'] = 'no-cache, no-store, must-revalidate'
     response.headers['Pragma'] = 'no-cache'
     response.headers['Expires'] = '0'
@@ -307,19 +377,58 @@ def dashboard(dataset_name):
     return response
 
 
+@app.route('/api/analyze/<dataset_name>', methods=['POST'])
+def submit_analysis(dataset_name):
+    """API端点：提交数据集分析任务，会话已缓存时直接返回done"""
+    force_reanalyze = request.args.get('force', 'false').lower() == 'true'
+    
+    session, job_id = get_session(dataset_name, force=force_reanalyze)
+    if session is None and job_id is None:
+        return jsonify({'error': f'数据集 {dataset_name} 不存在'}), 404
+    
+    job = analysis_jobs.status(job_id) if job_id is not None else None
+    return jsonify({
+        'success': True,
+        'job_id': job_id,
+        'status': 'done' if session is not None else (job['status'] if job else 'queued')
+    })
+
+
+@app.route('/api/jobs/<job_id>')
+def job_status(job_id):
+    """API端点：查询后台分析任务的状态、当前阶段和进度百分比"""
+    job = analysis_jobs.status(job_id)
+    if job is None:
+        return jsonify({'error': f'任务 {job_id} 不存在'}), 404
+    return jsonify(job)
+
+
 @app.route('/api/figures')
 def get_figures():
-    """API端点：获取所有图表的JSON数据"""
-    if current_visualizer is None:
-        return jsonify({'error': '尚未进行分析'}), 400
-    
+    """API端点：获取指定数据集（dataset参数）所有图表的JSON数据"""
     try:
-        figures_json = {}
-        for name, fig in current_visualizer.figures.items():
-            figures_json[name] = json.loads(fig.to_json())
-        
-        print(f"返回图表数据，包含 {len(figures_json)} 个图表")
-        return jsonify(figures_json)
+        session, error = session_from_request()
+        if error:
+            return error
+        
+        payload = session.figures_payload
+        accept_encodings = request.accept_encodings
+        if payload.brotli is not None and accept_encodings['br']:
+            encoding = 'br'
+        elif accept_encodings['gzip']:
+            encoding = 'gzip'
+        else:
+            encoding = None
+        
+        # 预先编码的压缩JSON，ETag为内容哈希加编码后缀，内容未变时条件请求返回304
+        response = app.response_class(payload.body(encoding), mimetype='application/json')
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        response.headers['Vary'] = 'Accept-Encoding'
+        response.set_etag(payload.etag_for(encoding))
+        response = response.make_conditional(request)
+        print(f"返回图表数据，包含 {session.figure_count} 个图表，状态 {response.status_code}")
+        return response
         
     except Exception as e:
         print(f"获取图表数据错误: {str(e)}")
@@ -328,10 +437,17 @@ def get_figures():
 
 @app.route('/api/summary')
 def api_summary():
-    """返回分析结果摘要"""
-    if not current_analyzer or not current_analyzer.analysis_results:
+    """返回指定数据集（dataset参数）的分析结果摘要"""
+    session, error = session_from_request()
+    if error:
+        return error
+    if not session.analyzer.analysis_results:
         return jsonify({'error': 'No analysis results available'}), 404
-    
+    return jsonify(build_summary(session.analyzer))
+
+
+def build_summary(analyzer):
+    """由分析器结果生成摘要字典"""
     summary = {
         'udp': None,
         'distance': None,
@@ -342,8 +458,8 @@ def api_summary():
     }
     
     # UDP统计
-    if 'udp' in current_analyzer.analysis_results:
-        udp_stats = current_analyzer.analysis_results['udp']
+    if 'udp' in analyzer.analysis_results:
+        udp_stats = analyzer.analysis_results['udp']
         summary['udp'] = {
             'total_sent': udp_stats['total_sent'],
             'total_received': udp_stats['total_received'],
@@ -355,8 +471,8 @@ def api_summary():
         }
     
     # 距离统计
-    if 'inter_drone_distance' in current_analyzer.analysis_results:
-        dist_stats = current_analyzer.analysis_results['inter_drone_distance']
+    if 'inter_drone_distance' in analyzer.analysis_results:
+        dist_stats = analyzer.analysis_results['inter_drone_distance']
         summary['distance'] = {
             'min_distance_3d': f"{dist_stats['min_distance_3d']:.2f}",
             'max_distance_3d': f"{dist_stats['max_distance_3d']:.2f}",
@@ -367,8 +483,8 @@ def api_summary():
         }
     
     # GPS统计
-    if 'gps' in current_analyzer.analysis_results:
-        for role, stats in current_analyzer.analysis_results['gps'].items():
+    if 'gps' in analyzer.analysis_results:
+        for role, stats in analyzer.analysis_results['gps'].items():
             summary['gps'][role] = {
                 'data_points': stats['data_points'],
                 'total_distance': f"{stats['total_distance']:.2f}",
@@ -378,8 +494,8 @@ def api_summary():
             }
     
     # NEXFI统计
-    if 'nexfi' in current_analyzer.analysis_results:
-        for role, stats in current_analyzer.analysis_results['nexfi'].items():
+    if 'nexfi' in analyzer.analysis_results:
+        for role, stats in analyzer.analysis_results['nexfi'].items():
             summary['nexfi'][role] = {
                 'avg_rssi': f"{stats['rssi']['mean']:.2f}",
                 'avg_snr': f"{stats['snr']['mean']:.2f}",
@@ -388,9 +504,9 @@ def api_summary():
             }
     
     # 相关性分析
-    if 'correlations' in current_analyzer.analysis_results:
+    if 'correlations' in analyzer.analysis_results:
         summary['correlations'] = {}
-        for key, corr in current_analyzer.analysis_results['correlations'].items():
+        for key, corr in analyzer.analysis_results['correlations'].items():
             summary['correlations'][key] = {
                 'correlation': f"{corr['correlation']:.3f}",
                 'p_value': f"{corr['p_value']:.3f}",
@@ -398,62 +514,51 @@ def api_summary():
                 'data_points': corr['data_points']
             }
     
-    # 时间范围信息
-    time_ranges = {}
+    # 时间范围信息（分析器内部为Unix秒，此处转换为中国时间展示）
+    raw_ranges = {}
     
     # UDP时间范围
-    if 'udp' in current_analyzer.sender_data and not current_analyzer.sender_data['udp'].empty:
-        sender_udp = current_analyzer.sender_data['udp']
-        time_ranges['udp_sender'] = {
-            'start': sender_udp['timestamp'].min().strftime('%Y-%m-%d %H:%M:%S'),
-            'end': sender_udp['timestamp'].max().strftime('%Y-%m-%d %H:%M:%S')
-        }
+    if 'udp' in analyzer.sender_data and not analyzer.sender_data['udp'].empty:
+        sender_times = analyzer.sender_data['udp']['timestamp']
+        raw_ranges['udp_sender'] = (sender_times.min(), sender_times.max())
     
-    if 'udp' in current_analyzer.receiver_data and not current_analyzer.receiver_data['udp'].empty:
-        receiver_udp = current_analyzer.receiver_data['udp']
-        time_ranges['udp_receiver'] = {
-            'start': receiver_udp['recv_timestamp'].min().strftime('%Y-%m-%d %H:%M:%S'),
-            'end': receiver_udp['recv_timestamp'].max().strftime('%Y-%m-%d %H:%M:%S')
-        }
+    if 'udp' in analyzer.receiver_data and not analyzer.receiver_data['udp'].empty:
+        receiver_times = analyzer.receiver_data['udp']['recv_timestamp']
+        raw_ranges['udp_receiver'] = (receiver_times.min(), receiver_times.max())
     
     # GPS时间范围
     for role in ['sender', 'receiver']:
-        if role in current_analyzer.gps_data and not current_analyzer.gps_data[role].empty:
-            gps_data = current_analyzer.gps_data[role]
-            time_ranges[f'gps_{role}'] = {
-                'start': gps_data['timestamp'].min().strftime('%Y-%m-%d %H:%M:%S'),
-                'end': gps_data['timestamp'].max().strftime('%Y-%m-%d %H:%M:%S')
-            }
+        if role in analyzer.gps_data and not analyzer.gps_data[role].empty:
+            gps_times = analyzer.gps_data[role]['timestamp']
+            raw_ranges[f'gps_{role}'] = (gps_times.min(), gps_times.max())
     
     # NEXFI时间范围
     for role in ['sender', 'receiver']:
-        if role in current_analyzer.nexfi_data and not current_analyzer.nexfi_data[role].empty:
-            nexfi_data = current_analyzer.nexfi_data[role]
-            time_ranges[f'nexfi_{role}'] = {
-                'start': nexfi_data['timestamp'].min().strftime('%Y-%m-%d %H:%M:%S'),
-                'end': nexfi_data['timestamp'].max().strftime('%Y-%m-%d %H:%M:%S')
-            }
+        if role in analyzer.nexfi_data and not analyzer.nexfi_data[role].empty:
+            nexfi_times = analyzer.nexfi_data[role]['timestamp']
+            raw_ranges[f'nexfi_{role}'] = (nexfi_times.min(), nexfi_times.max())
+    
+    def format_time(epoch_seconds):
+        return analyzer.convert_to_china_time(epoch_seconds).strftime('%Y-%m-%d %H:%M:%S')
+    
+    time_ranges = {
+        key: {'start': format_time(start), 'end': format_time(end)}
+        for key, (start, end) in raw_ranges.items()
+    }
     
     # 计算有效时间范围（所有数据的交集）
-    if time_ranges:
-        all_starts = []
-        all_ends = []
-        
-        for key, range_info in time_ranges.items():
-            all_starts.append(pd.to_datetime(range_info['start']))
-            all_ends.append(pd.to_datetime(range_info['end']))
-        
-        effective_start = max(all_starts)
-        effective_end = min(all_ends)
+    if raw_ranges:
+        effective_start = max(start for start, _ in raw_ranges.values())
+        effective_end = min(end for _, end in raw_ranges.values())
         
         summary['time_range'] = {
-            'effective_start': effective_start.strftime('%Y-%m-%d %H:%M:%S'),
-            'effective_end': effective_end.strftime('%Y-%m-%d %H:%M:%S'),
-            'duration_seconds': (effective_end - effective_start).total_seconds(),
+            'effective_start': format_time(effective_start),
+            'effective_end': format_time(effective_end),
+            'duration_seconds': float(effective_end - effective_start),
             'individual_ranges': time_ranges
         }
     
-    return jsonify(summary)
+    return summary
 
 
 @app.route('/api/datasets')
@@ -466,27 +571,16 @@ def get_datasets():
 @app.route('/api/delete_dataset/<dataset_name>', methods=['DELETE'])
 def delete_dataset(dataset_name):
     """API端点：删除指定数据集"""
-    global current_analyzer, current_visualizer
-    
     try:
         # 查找数据集路径
-        dataset_path = None
-        dataset_info = None
-        for dataset in available_datasets:
-            if dataset['name'] == dataset_name:
-                dataset_path = dataset['path']
-                dataset_info = dataset
-                break
+        dataset_path = find_dataset_path(dataset_name)
+        dataset_info = next((dataset for dataset in available_datasets if dataset['name'] == dataset_name), None)
         
-        if not dataset_path or not os.path.exists(dataset_path):
+        if not dataset_path:
             return jsonify({'error': f'数据集 {dataset_name} 不存在'}), 404
         
-        # 检查是否为当前正在分析的数据集
-        if current_analyzer and hasattr(current_analyzer, 'dataset_path'):
-            if os.path.abspath(current_analyzer.dataset_path) == os.path.abspath(dataset_path):
-                # 清理当前分析器和可视化器
-                current_analyzer = None
-                current_visualizer = None
+        # 清理该数据集缓存的分析会话
+        session_cache.invalidate(dataset_name)
         
         # 删除数据集目录
         if os.path.exists(dataset_path):
@@ -510,36 +604,18 @@ def delete_dataset(dataset_name):
 @app.route('/api/force_reanalyze/<dataset_name>', methods=['POST'])
 def force_reanalyze(dataset_name):
     """强制重新分析数据集"""
-    global current_analyzer, current_visualizer
-    
     try:
-        # 清理当前分析器和可视化器
-        current_analyzer = None
-        current_visualizer = None
-        
-        # 查找数据集路径
-        dataset_path = None
-        for dataset in available_datasets:
-            if dataset['name'] == dataset_name:
-                dataset_path = dataset['path']
-                break
-        
-        if not dataset_path or not os.path.exists(dataset_path):
-            return jsonify({'error': f'数据集 {dataset_name} 不存在'}), 404
-        
         print(f"强制重新分析数据集: {dataset_name}")
         
-        # 创建新的分析器并运行分析
-        current_analyzer = DroneCommAnalyzer(dataset_path)
-        current_analyzer.run_full_analysis()
-        
-        # 创建新的可视化器并生成图表
-        current_visualizer = DroneCommVisualizer(current_analyzer)
-        current_visualizer.create_all_plots()
+        # 丢弃该数据集缓存的会话，提交后台重新分析任务
+        _, job_id = get_session(dataset_name, force=True)
+        if job_id is None:
+            return jsonify({'error': f'数据集 {dataset_name} 不存在'}), 404
         
         return jsonify({
             'success': True,
-            'message': f'数据集 {dataset_name} 重新分析完成',
+            'message': f'已提交数据集 {dataset_name} 的重新分析任务',
+            'job_id': job_id,
             'timestamp': datetime.now().isoformat()
         })
         
@@ -553,12 +629,9 @@ def force_reanalyze(dataset_name):
 @app.route('/api/clear_cache', methods=['POST'])
 def clear_cache():
     """API端点：清理服务器端缓存"""
-    global current_analyzer, current_visualizer
-    
     try:
-        # 清理当前分析器和可视化器
-        current_analyzer = None
-        current_visualizer = None
+        # 清理所有缓存的分析会话
+        session_cache.clear()
         
         # 清理临时文件
         temp_dirs = ['/tmp', tempfile.gettempdir()]
@@ -588,31 +661,36 @@ def clear_cache():
         return jsonify({'error': f'清理缓存失败: {str(e)}'}), 500
 
 
+@app.route('/api/cache_stats')
+def cache_stats():
+    """API端点：分析会话缓存的占用和命中统计"""
+    return jsonify(session_cache.stats())
+
+
 @app.route('/api/download_report/<dataset_name>')
 def download_report(dataset_name):
     """API端点：下载分析报告"""
-    if current_analyzer is None or current_visualizer is None:
-        return jsonify({'error': '尚未进行分析'}), 400
-    
     try:
+        session, job_id = get_session(dataset_name)
+        if session is None:
+            return pending_response(dataset_name, job_id)
+        
         # 创建临时文件
         temp_dir = tempfile.mkdtemp()
         zip_path = os.path.join(temp_dir, f'{dataset_name}_analysis_report.zip')
         
         with zipfile.ZipFile(zip_path, 'w') as zipf:
             # 保存分析结果JSON
-            results_json = json.dumps(current_analyzer.analysis_results, indent=2, default=str)
+            results_json = session.analyzer.results_to_json()
             zipf.writestr(f'{dataset_name}_analysis_results.json', results_json)
             
-            # 保存摘要 - 直接调用api_summary的逻辑
-            summary_response = api_summary()
-            if summary_response.status_code == 200:
-                summary_data = summary_response.get_json()
-                summary_json = json.dumps(summary_data, indent=2, default=str)
+            # 保存摘要
+            if session.analyzer.analysis_results:
+                summary_json = json.dumps(build_summary(session.analyzer), indent=2, default=str)
                 zipf.writestr(f'{dataset_name}_summary.json', summary_json)
             
             # 保存所有图表为HTML
-            for name, fig in current_visualizer.figures.items():
+            for name, fig in session.figures().items():
                 html_content = fig.to_html(include_plotlyjs='cdn')
                 zipf.writestr(f'plots/{name}.html', html_content)
         
@@ -639,95 +717,67 @@ def compare_multiple_datasets():
         return jsonify({'error': '至少需要选择两个数据集进行比较'}), 400
     
     comparison_results = {}
+    pending = {}
     
     for dataset_name in dataset_names:
         # 查找数据集路径
-        dataset_path = None
-        for dataset in available_datasets:
-            if dataset['name'] == dataset_name:
-                dataset_path = dataset['path']
-                break
+        dataset_path = find_dataset_path(dataset_name)
         
-        if not dataset_path or not os.path.exists(dataset_path):
+        if not dataset_path:
             comparison_results[dataset_name] = {'error': '数据集不存在'}
             continue
-            
-        try:
-            analyzer = DroneCommAnalyzer(dataset_path)
-            analyzer.run_full_analysis()
-            
-            # 提取关键指标
-            metrics = {}
-            if 'udp' in analyzer.analysis_results:
-                metrics['packet_loss_rate'] = analyzer.analysis_results['udp']['packet_loss_rate']
-                metrics['avg_delay'] = analyzer.analysis_results['udp']['delay_stats']['mean']
-                metrics['max_delay'] = analyzer.analysis_results['udp']['delay_stats']['max']
-                metrics['throughput'] = analyzer.analysis_results['udp']['throughput_kbps']
-                metrics['total_sent'] = analyzer.analysis_results['udp']['total_sent']
-                metrics['total_received'] = analyzer.analysis_results['udp']['total_received']
-            
-            if 'inter_drone_distance' in analyzer.analysis_results:
-                metrics['avg_distance_3d'] = analyzer.analysis_results['inter_drone_distance']['mean_distance_3d']
-                metrics['max_distance_3d'] = analyzer.analysis_results['inter_drone_distance']['max_distance_3d']
-                metrics['min_distance_3d'] = analyzer.analysis_results['inter_drone_distance']['min_distance_3d']
-            
-            if 'nexfi' in analyzer.analysis_results:
-                for role, stats in analyzer.analysis_results['nexfi'].items():
-                    metrics[f'{role}_avg_rssi'] = stats['rssi']['mean']
-                    metrics[f'{role}_avg_snr'] = stats['snr']['mean']
-                    metrics[f'{role}_avg_link_quality'] = stats['link_quality']['mean']
-            
-            if 'gps' in analyzer.analysis_results:
-                for role, stats in analyzer.analysis_results['gps'].items():
-                    metrics[f'{role}_flight_distance'] = stats['total_distance']
-                    metrics[f'{role}_flight_time'] = stats['flight_time']
-                    metrics[f'{role}_max_speed'] = stats['max_speed']
-            
-            comparison_results[dataset_name] = metrics
-            
-        except Exception as e:
-            comparison_results[dataset_name] = {'error': str(e)}
+        
+        # 已缓存的分析会话直接提取指标，其余数据集在进程池中并行计算（优先读取结果存储）
+        session = session_cache.get((dataset_name, dataset_fingerprint(dataset_path)))
+        if session is not None:
+            comparison_results[dataset_name] = extract_comparison_metrics(session.analyzer.analysis_results)
+        else:
+            pending[dataset_name] = dataset_path
+    
+    comparison_results.update(analysis_jobs.compare(pending))
     
     return jsonify(comparison_results)
 
 
 @app.route('/api/trajectory_data')
 def get_trajectory_data():
-    """API端点：获取轨迹回放数据"""
-    if current_analyzer is None:
-        return jsonify({'error': '尚未进行分析'}), 400
+    """API端点：获取指定数据集（dataset参数）的轨迹回放数据"""
+    session, error = session_from_request()
+    if error:
+        return error
+    analyzer = session.analyzer
     
     try:
         # 添加详细的调试信息
         print("=== Trajectory Data API Debug ===")
-        print(f"current_analyzer存在: {current_analyzer is not None}")
+        print(f"analyzer存在: {analyzer is not None}")
         
-        if current_analyzer:
-            print(f"current_analyzer类型: {type(current_analyzer)}")
-            print(f"hasattr gps_data: {hasattr(current_analyzer, 'gps_data')}")
-            print(f"hasattr sender_data: {hasattr(current_analyzer, 'sender_data')}")
-            print(f"hasattr analysis_results: {hasattr(current_analyzer, 'analysis_results')}")
+        if analyzer:
+            print(f"analyzer类型: {type(analyzer)}")
+            print(f"hasattr gps_data: {hasattr(analyzer, 'gps_data')}")
+            print(f"hasattr sender_data: {hasattr(analyzer, 'sender_data')}")
+            print(f"hasattr analysis_results: {hasattr(analyzer, 'analysis_results')}")
             
-            if hasattr(current_analyzer, 'gps_data'):
-                print(f"gps_data类型: {type(current_analyzer.gps_data)}")
-                print(f"gps_data是否为None: {current_analyzer.gps_data is None}")
-                if current_analyzer.gps_data:
-                    print(f"gps_data键: {list(current_analyzer.gps_data.keys()) if isinstance(current_analyzer.gps_data, dict) else 'Not a dict'}")
+            if hasattr(analyzer, 'gps_data'):
+                print(f"gps_data类型: {type(analyzer.gps_data)}")
+                print(f"gps_data是否为None: {analyzer.gps_data is None}")
+                if analyzer.gps_data:
+                    print(f"gps_data键: {list(analyzer.gps_data.keys()) if isinstance(analyzer.gps_data, dict) else 'Not a dict'}")
                     for role in ['sender', 'receiver']:
-                        if role in current_analyzer.gps_data:
-                            df = current_analyzer.gps_data[role]
+                        if role in analyzer.gps_data:
+                            df = analyzer.gps_data[role]
                             print(f"gps_data[{role}]形状: {df.shape if hasattr(df, 'shape') else 'No shape'}")
                             if hasattr(df, 'columns'):
                                 print(f"gps_data[{role}]列: {list(df.columns)}")
                             if hasattr(df, 'empty'):
                                 print(f"gps_data[{role}]是否为空: {df.empty}")
             
-            if hasattr(current_analyzer, 'sender_data'):
-                print(f"sender_data类型: {type(current_analyzer.sender_data)}")
-                if isinstance(current_analyzer.sender_data, dict):
-                    print(f"sender_data键: {list(current_analyzer.sender_data.keys())}")
-                    if 'udp' in current_analyzer.sender_data:
-                        udp_df = current_analyzer.sender_data['udp']
+            if hasattr(analyzer, 'sender_data'):
+                print(f"sender_data类型: {type(analyzer.sender_data)}")
+                if isinstance(analyzer.sender_data, dict):
+                    print(f"sender_data键: {list(analyzer.sender_data.keys())}")
+                    if 'udp' in analyzer.sender_data:
+                        udp_df = analyzer.sender_data['udp']
                         print(f"sender_data['udp']形状: {udp_df.shape if hasattr(udp_df, 'shape') else 'No shape'}")
         
         trajectory_data = {
@@ -743,45 +793,23 @@ def get_trajectory_data():
         
         # 安全的GPS数据处理
         try:
-            if (hasattr(current_analyzer, 'gps_data') and 
-                current_analyzer.gps_data and 
-                isinstance(current_analyzer.gps_data, dict)):
+            if (hasattr(analyzer, 'gps_data') and 
+                analyzer.gps_data and 
+                isinstance(analyzer.gps_data, dict)):
                 
-                print(f"GPS数据字典键: {list(current_analyzer.gps_data.keys())}")
+                print(f"GPS数据字典键: {list(analyzer.gps_data.keys())}")
                 
-                # 收集所有GPS点用于计算参考点
-                all_lats = []
-                all_lons = []
+                # 使用分析器缓存的本地ENU坐标系（参考点为全部GPS点的中心）
+                analyzer.ensure_local_coordinates()
+                local_frame = analyzer.get_local_frame()
                 
-                for role in ['sender', 'receiver']:
-                    if role in current_analyzer.gps_data:
-                        gps_df = current_analyzer.gps_data[role]
-                        print(f"GPS数据[{role}]: 类型={type(gps_df)}, 形状={gps_df.shape if hasattr(gps_df, 'shape') else '无形状'}")
-                        
-                        if (gps_df is not None and 
-                            hasattr(gps_df, 'empty') and not gps_df.empty and
-                            'latitude' in gps_df.columns and 'longitude' in gps_df.columns):
-                            
-                            # 过滤掉nan值
-                            valid_rows = gps_df.dropna(subset=['latitude', 'longitude'])
-                            print(f"GPS数据[{role}]: 有效行数={len(valid_rows)}/{len(gps_df)}")
-                            
-                            if len(valid_rows) > 0:
-                                all_lats.extend(valid_rows['latitude'].tolist())
-                                all_lons.extend(valid_rows['longitude'].tolist())
-                
-                print(f"收集到的坐标点数: {len(all_lats)} 个")
-                
-                if all_lats and all_lons:
-                    ref_lat = sum(all_lats) / len(all_lats)
-                    ref_lon = sum(all_lons) / len(all_lons)
-                    
-                    print(f"参考点设定为: lat={ref_lat:.6f}, lon={ref_lon:.6f}")
+                if local_frame is not None:
+                    print(f"参考点设定为: lat={local_frame.ref_lat:.6f}, lon={local_frame.ref_lon:.6f}")
                     
                     # 处理每个角色的GPS数据
                     for role in ['sender', 'receiver']:
-                        if role in current_analyzer.gps_data:
-                            gps_df = current_analyzer.gps_data[role]
+                        if role in analyzer.gps_data:
+                            gps_df = analyzer.gps_data[role]
                             
                             if (gps_df is not None and 
                                 hasattr(gps_df, 'empty') and not gps_df.empty):
@@ -792,32 +820,18 @@ def get_trajectory_data():
                                 # 限制数据量以避免过载，但取更多数据点
                                 sample_df = valid_rows.head(100) if len(valid_rows) > 100 else valid_rows
                                 
-                                points_added = 0
-                                for index, row in sample_df.iterrows():
-                                    try:
-                                        lat = float(row['latitude'])
-                                        lon = float(row['longitude'])
-                                        alt = float(row.get('altitude', 0))
-                                        
-                                        # 简化的坐标转换（近似）
-                                        x = (lon - ref_lon) * 111320 * math.cos(math.radians(ref_lat))
-                                        y = (lat - ref_lat) * 111320
-                                        
-                                        trajectory_data[role].append({
-                                            'x': round(x, 2),
-                                            'y': round(y, 2),
-                                            'z': round(alt, 2),
-                                            'timestamp': row['timestamp'].isoformat()
-                                        })
-                                        
-                                        points_added += 1
-                                        has_real_data = True
-                                        
-                                    except Exception as e:
-                                        print(f"处理{role} GPS数据行错误: {e}")
-                                        continue
+                                altitudes = sample_df['altitude'].fillna(0) if 'altitude' in sample_df.columns else pd.Series(0.0, index=sample_df.index)
+                                timestamps = analyzer.convert_to_china_time(sample_df['timestamp'])
+                                trajectory_data[role].extend(
+                                    {'x': x, 'y': y, 'z': z, 'timestamp': ts.isoformat()}
+                                    for x, y, z, ts in zip(sample_df['east'].round(2).tolist(),
+                                                           sample_df['north'].round(2).tolist(),
+                                                           altitudes.round(2).tolist(), timestamps)
+                                )
+                                if len(sample_df) > 0:
+                                    has_real_data = True
                                 
-                                print(f"为{role}添加了{points_added}个GPS点")
+                                print(f"为{role}添加了{len(sample_df)}个GPS点")
                 else:
                     print("没有找到有效的GPS坐标数据")
                     
@@ -831,13 +845,13 @@ def get_trajectory_data():
             metrics_added = 0
             
             # 优先使用接收方数据，因为它包含延迟信息
-            if (hasattr(current_analyzer, 'receiver_data') and 
-                isinstance(current_analyzer.receiver_data, dict) and
-                'udp' in current_analyzer.receiver_data and 
-                current_analyzer.receiver_data['udp'] is not None and
-                not current_analyzer.receiver_data['udp'].empty):
+            if (hasattr(analyzer, 'receiver_data') and 
+                isinstance(analyzer.receiver_data, dict) and
+                'udp' in analyzer.receiver_data and 
+                analyzer.receiver_data['udp'] is not None and
+                not analyzer.receiver_data['udp'].empty):
                 
-                udp_df = current_analyzer.receiver_data['udp']
+                udp_df = analyzer.receiver_data['udp']
                 print(f"使用接收方UDP数据，形状: {udp_df.shape}")
                 print(f"接收方UDP列: {list(udp_df.columns)}")
                 
@@ -852,7 +866,7 @@ def get_trajectory_data():
                                 delay_value = float(row['delay']) * 1000  # 转换为毫秒
                             
                             trajectory_data['metrics'].append({
-                                'timestamp': row['recv_timestamp'].isoformat(),
+                                'timestamp': analyzer.convert_to_china_time(row['recv_timestamp']).isoformat(),
                                 'delay': delay_value,
                                 'packet_loss': 0
                             })
@@ -865,13 +879,13 @@ def get_trajectory_data():
                 print(f"从接收方添加了{metrics_added}个UDP指标数据点")
                 
             # 如果接收方数据不可用，尝试发送方数据
-            elif (hasattr(current_analyzer, 'sender_data') and 
-                  isinstance(current_analyzer.sender_data, dict) and
-                  'udp' in current_analyzer.sender_data and 
-                  current_analyzer.sender_data['udp'] is not None and
-                  not current_analyzer.sender_data['udp'].empty):
+            elif (hasattr(analyzer, 'sender_data') and 
+                  isinstance(analyzer.sender_data, dict) and
+                  'udp' in analyzer.sender_data and 
+                  analyzer.sender_data['udp'] is not None and
+                  not analyzer.sender_data['udp'].empty):
                 
-                udp_df = current_analyzer.sender_data['udp']
+                udp_df = analyzer.sender_data['udp']
                 print(f"使用发送方UDP数据，形状: {udp_df.shape}")
                 
                 # 限制数据量，取前50个数据点
@@ -881,7 +895,7 @@ def get_trajectory_data():
                     try:
                         if pd.notna(row.get('timestamp')):
                             trajectory_data['metrics'].append({
-                                'timestamp': row['timestamp'].isoformat(),
+                                'timestamp': analyzer.convert_to_china_time(row['timestamp']).isoformat(),
                                 'delay': None,  # 发送方数据通常没有延迟信息
                                 'packet_loss': 0
                             })
@@ -900,11 +914,11 @@ def get_trajectory_data():
         
         # 安全的统计信息处理
         try:
-            if (hasattr(current_analyzer, 'analysis_results') and 
-                current_analyzer.analysis_results and 
-                'udp' in current_analyzer.analysis_results):
+            if (hasattr(analyzer, 'analysis_results') and 
+                analyzer.analysis_results and 
+                'udp' in analyzer.analysis_results):
                 
-                udp_stats = current_analyzer.analysis_results['udp']
+                udp_stats = analyzer.analysis_results['udp']
                 trajectory_data['overall_stats'] = {
                     'packet_loss_rate': udp_stats.get('packet_loss_rate', 0),
                     'avg_delay': udp_stats.get('delay_stats', {}).get('mean', 0),
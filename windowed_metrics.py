@@ -0,0 +1,330 @@
+import numpy as np
+import pandas as pd
+
+
+# 默认统计窗口长度（秒）
+DEFAULT_WINDOWS = (1.0, 5.0, 30.0)
+
+# 窗口指标表的列
+WINDOW_COLUMNS = [
+    'window_start', 'window_end', 'sent_packets', 'received_packets', 'lost_packets', 'loss_rate',
+    'delay_mean', 'delay_p50', 'delay_p99', 'jitter', 'received_bytes', 'throughput_kbps'
+]
+
+
+def _bin_index(times, origin, step, bins):
+    """按步长将时间点分入细分桶，返回落在[0, bins)内的桶索引及对应掩码"""
+    index = np.floor((times - origin) / step).astype(np.int64)
+    valid = (index >= 0) & (index < bins)
+    if valid.all():
+        return index, None
+    return index[valid], valid
+
+
+def _bin_sum(index, valid, bins, weights=None):
+    """细分桶的计数（或权重和）"""
+    if weights is not None and valid is not None:
+        weights = weights[valid]
+    return np.bincount(index, weights=weights, minlength=bins)
+
+
+def _sliding_sum(fine, phases):
+    """窗口m覆盖细分桶[m, m + phases)，用累积和一次求出所有窗口的总和"""
+    cumulative = np.concatenate(([0], np.cumsum(fine)))
+    starts = np.arange(len(fine))
+    return cumulative[np.minimum(starts + phases, len(fine))] - cumulative[starts]
+
+
+def _percentiles_from_keys(keys, sizes, quantiles, low, scale):
+    """
+    由已排序的“窗口索引 + 归一化数值”键计算每个窗口的分位数（线性插值，与np.percentile一致）
+
+    sizes为各窗口的数值个数，只还原分位数位置上的数值。
+    """
+    sizes = np.asarray(sizes, dtype=np.int64)
+    result = np.full((len(quantiles), len(sizes)), np.nan)
+    present = np.flatnonzero(sizes > 0)
+    starts = (np.cumsum(sizes) - sizes)[present]
+    sizes = sizes[present]
+
+    def value_at(position):
+        key = keys[position]
+        return (key - np.floor(key)) * scale + low
+
+    for row, q in enumerate(quantiles):
+        position = q * (sizes - 1)
+        lower = np.floor(position).astype(np.int64)
+        upper = np.minimum(lower + 1, sizes - 1)
+        lower_values = value_at(starts + lower)
+        result[row, present] = lower_values + (value_at(starts + upper) - lower_values) * (position - lower)
+    return result
+
+
+def _selected_percentiles(values, sizes, quantiles):
+    """
+    由按窗口连续分段（段内不必有序）的数值计算每个窗口的分位数（线性插值，与np.percentile一致）
+
+    每个窗口只对其一段数值做np.partition，选出分位数位置上的数值，不排序整个窗口。
+    """
+    sizes = np.asarray(sizes, dtype=np.int64)
+    result = np.full((len(quantiles), len(sizes)), np.nan)
+    ends = np.cumsum(sizes)
+    quantiles = np.asarray(quantiles, dtype=np.float64)
+    for window in np.flatnonzero(sizes > 0):
+        size = sizes[window]
+        position = quantiles * (size - 1)
+        lower = np.floor(position).astype(np.int64)
+        upper = np.minimum(lower + 1, size - 1)
+        selected = np.partition(values[ends[window] - size:ends[window]], np.union1d(lower, upper))
+        result[:, window] = selected[lower] + (selected[upper] - selected[lower]) * (position - lower)
+    return result
+
+
+def grouped_percentiles(group_index, values, count, quantiles):
+    """
+    按分组索引计算每组数值的分位数（线性插值，与np.percentile一致）
+
+    Args:
+        group_index: 每个数值所属的组索引（0 ~ count-1）
+        values: 数值数组
+        count (int): 组数
+        quantiles: 分位数（0~1）序列
+
+    Returns:
+        numpy数组: 形状为(len(quantiles), count)，空组为NaN
+    """
+    group_index = np.asarray(group_index, dtype=np.int64)
+    values = np.asarray(values, dtype=np.float64)
+    if len(values) == 0:
+        return np.full((len(quantiles), count), np.nan)
+
+    low, high = values.min(), values.max()
+    scale = (high - low) / 0.999 if high > low else 1.0
+    keys = np.sort(group_index + (values - low) / scale)
+    return _percentiles_from_keys(keys, np.bincount(group_index, minlength=count), quantiles, low, scale)
+
+
+def _regroup_keys(keys, counts, group, skip=0):
+    """
+    将按细分桶排序的键改为按新分组索引排列
+
+    counts为各细分桶的数值个数，group为各细分桶所属的新分组（单调不减）；跳过前skip个细分桶。
+    同一分组由若干相邻的有序段组成，稳定排序（timsort）只需合并这些有序段。
+    """
+    offset = (group[skip:] - np.arange(skip, len(counts))).astype(np.float64)
+    regrouped = keys[counts[:skip].sum():] + np.repeat(offset, counts[skip:])
+    if len(counts) - skip > len(np.unique(group[skip:])):
+        regrouped = np.sort(regrouped, kind='stable')
+    return regrouped
+
+
+def _sliding_percentiles(keys, counts, phases, quantiles, low, scale):
+    """
+    由按细分桶、桶内按数值排序的键计算每个窗口内数值的分位数
+
+    第j个相位的窗口（起点桶为j + i * phases）由phases个相邻的有序段组成，合并后即得到该相位的分组有序序列。
+    """
+    total = len(counts)
+    result = np.full((len(quantiles), total), np.nan)
+    if len(keys) == 0:
+        return result
+
+    sizes = _sliding_sum(counts, phases)
+    for phase in range(phases):
+        if phases == 1:
+            phase_keys = keys
+        else:
+            group = np.maximum(np.arange(total) - phase, 0) // phases
+            phase_keys = _regroup_keys(keys, counts, group, skip=phase)
+        result[:, phase::phases] = _percentiles_from_keys(phase_keys, sizes[phase::phases], quantiles, low, scale)
+    return result
+
+
+def _bin_level(data, origin, step, total):
+    """
+    按步长将数据分入细分桶：统计各桶的计数和求和，并将延迟排序为“桶索引 + 归一化数值”键
+
+    键只在最细的层级完整排序一次，更粗的层级由_coarsen_level直接沿用。
+    """
+    level = {'origin': origin, 'step': step, 'total': total}
+
+    sent_index, sent_valid = _bin_index(data['sent_times'], origin, step, total)
+    level['sent_packets'] = _bin_sum(sent_index, sent_valid, total)
+
+    # 接收包按发送时间归入窗口，与发送计数对应计算丢包和延迟
+    send_index, send_valid = _bin_index(data['send_times'], origin, step, total)
+    delays = data['delays'] if send_valid is None else data['delays'][send_valid]
+    level['received_packets'] = _bin_sum(send_index, None, total)
+    level['delay_sum'] = _bin_sum(send_index, None, total, delays)
+    if len(delays) > 0:
+        low, high = delays.min(), delays.max()
+        scale = (high - low) / 0.999 if high > low else 1.0
+        # 数据按时间排序时键已按桶分段，稳定排序更快
+        level['delay_keys'] = np.sort(send_index + (delays - low) / scale, kind='stable')
+    else:
+        low, scale = 0.0, 1.0
+        level['delay_keys'] = np.empty(0)
+    level['delay_low'], level['delay_scale'] = low, scale
+
+    # 吞吐量按实际到达时间和逐包字节数统计
+    recv_index, recv_valid = _bin_index(data['recv_times'], origin, step, total)
+    level['received_bytes'] = _bin_sum(recv_index, recv_valid, total, data['recv_sizes'])
+
+    if data['jitter'] is not None:
+        jitter_index, jitter_valid = _bin_index(data['jitter_times'], origin, step, total)
+        level['jitter_count'] = _bin_sum(jitter_index, jitter_valid, total)
+        level['jitter_sum'] = _bin_sum(jitter_index, jitter_valid, total, data['jitter'])
+    else:
+        level['jitter_count'] = np.zeros(total, dtype=np.int64)
+        level['jitter_sum'] = np.zeros(total)
+    return level
+
+
+def _coarsen_level(level, origin, step, total):
+    """
+    由细分层级得到步长为其整数倍、边界对齐的粗层级
+
+    计数和求和按桶累加；粗层级的每个桶由相邻的若干细分桶组成，细层级的延迟已按粗层级的桶连续分段，
+    由键还原为延迟值后直接沿用而不合并排序，分位数由_selected_percentiles按桶选出。
+    """
+    ratio = int(round(step / level['step']))
+    shift = int(round((level['origin'] - origin) / level['step']))
+    row = np.minimum((np.arange(level['total']) + shift) // ratio, total - 1)
+    if 'delay_values' in level:
+        delay_values = level['delay_values']
+    else:
+        keys = level['delay_keys']
+        delay_values = (keys - np.floor(keys)) * level['delay_scale'] + level['delay_low']
+    coarse = {'origin': origin, 'step': step, 'total': total, 'delay_values': delay_values}
+    for name in ('sent_packets', 'received_packets', 'jitter_count'):
+        coarse[name] = np.bincount(row, weights=level[name], minlength=total).astype(np.int64)
+    for name in ('delay_sum', 'received_bytes', 'jitter_sum'):
+        coarse[name] = np.bincount(row, weights=level[name], minlength=total)
+    return coarse
+
+
+def _window_table(level, window, phases):
+    """
+    由层级的细分桶统计生成窗口m覆盖细分桶[m, m + phases)的逐窗口指标表
+
+    粗层级只保存按桶分段的延迟值（delay_values），只用于滚动窗口（phases为1）。
+    """
+    total = level['total']
+    received_packets = _sliding_sum(level['received_packets'], phases)
+    jitter_count = _sliding_sum(level['jitter_count'], phases)
+    if 'delay_values' in level:
+        p50, p99 = _selected_percentiles(level['delay_values'], level['received_packets'], (0.5, 0.99))
+    else:
+        p50, p99 = _sliding_percentiles(level['delay_keys'], level['received_packets'], phases, (0.5, 0.99),
+                                        level['delay_low'], level['delay_scale'])
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        columns = {
+            'sent_packets': _sliding_sum(level['sent_packets'], phases),
+            'received_packets': received_packets,
+            'delay_mean': _sliding_sum(level['delay_sum'], phases) / received_packets * 1000,
+            'delay_p50': p50 * 1000,
+            'delay_p99': p99 * 1000,
+            'jitter': _sliding_sum(level['jitter_sum'], phases) / jitter_count * 1000,
+            'received_bytes': _sliding_sum(level['received_bytes'], phases)
+        }
+
+    table = pd.DataFrame(columns)
+    table.insert(0, 'window_start', level['origin'] + np.arange(total) * level['step'])
+    table.insert(1, 'window_end', table['window_start'] + window)
+    table['lost_packets'] = np.maximum(table['sent_packets'] - table['received_packets'], 0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        table['loss_rate'] = np.where(table['sent_packets'] > 0,
+                                      table['lost_packets'] / table['sent_packets'] * 100, 0.0)
+    table['throughput_kbps'] = table['received_bytes'] * 8 / (window * 1000)
+    return table[WINDOW_COLUMNS]
+
+
+def compute_window_tables(sent_times, send_times, recv_times, delays, recv_sizes,
+                          jitter_times=None, jitter=None, windows=DEFAULT_WINDOWS, step=None):
+    """
+    计算多个窗口长度的UDP链路逐窗口指标表
+
+    计数、求和类指标先按step细分桶bincount，再用累积和得到每个窗口的总和；分位数将滑动窗口
+    拆分为window/step个相位错开的滚动窗口分别计算后交错合并，结果与逐窗口精确计算一致。
+    延迟只在最细的层级完整排序一次：滑动窗口共用步长层级；滚动窗口从小到大处理，能被已处理的
+    较小窗口整除的窗口直接合并该层级的桶统计，分位数在该层级的键上按窗口选出，不再排序。
+    滑动窗口要求各窗口长度为step的整数倍，step为None时为滚动窗口。
+
+    Args:
+        sent_times: 发送方数据包时间戳（秒）
+        send_times: 接收方记录的发送时间戳（秒），用于与发送计数对应计算丢包和延迟
+        recv_times: 接收时间戳（秒），用于计算吞吐量
+        delays: 延迟（秒），与send_times一一对应
+        recv_sizes: 接收包字节数，与recv_times一一对应
+        jitter_times, jitter: 抖动时间序列（秒），可选
+        windows: 窗口长度（秒）序列
+        step (float): 滑动步长（秒），为None时使用滚动窗口
+
+    Returns:
+        dict: {窗口长度: DataFrame}，每行一个窗口，列见WINDOW_COLUMNS；时间为Unix秒，延迟和抖动为毫秒
+    """
+    data = {
+        'sent_times': np.asarray(sent_times, dtype=np.float64),
+        'send_times': np.asarray(send_times, dtype=np.float64),
+        'recv_times': np.asarray(recv_times, dtype=np.float64),
+        'delays': np.asarray(delays, dtype=np.float64),
+        'recv_sizes': np.asarray(recv_sizes, dtype=np.float64),
+        'jitter_times': None if jitter is None else np.asarray(jitter_times, dtype=np.float64),
+        'jitter': None if jitter is None else np.asarray(jitter, dtype=np.float64)
+    }
+    windows = sorted(set(float(window) for window in windows))
+    if any(window <= 0 for window in windows):
+        raise ValueError("窗口长度必须为正数")
+    if step is not None:
+        for window in windows:
+            phases = int(round(window / step))
+            if phases < 1 or not np.isclose(phases * step, window):
+                raise ValueError("滑动窗口长度必须是步长的整数倍")
+
+    all_times = [data[name] for name in ('sent_times', 'send_times', 'recv_times') if len(data[name]) > 0]
+    if not all_times:
+        return {window: pd.DataFrame(columns=WINDOW_COLUMNS) for window in windows}
+    start = min(times.min() for times in all_times)
+    end = max(times.max() for times in all_times)
+
+    def grid(grid_step):
+        origin = np.floor(start / grid_step) * grid_step
+        return origin, grid_step, int(np.floor((end - origin) / grid_step)) + 1
+
+    tables = {}
+    if step is not None:
+        level = _bin_level(data, *grid(step))
+        for window in windows:
+            tables[window] = _window_table(level, window, int(round(window / step)))
+        return tables
+
+    levels = []
+    for window in windows:
+        ratio = 0
+        source = None
+        for candidate in reversed(levels):
+            ratio = int(round(window / candidate['step']))
+            if ratio >= 1 and np.isclose(ratio * candidate['step'], window):
+                source = candidate
+                break
+        level = _bin_level(data, *grid(window)) if source is None else _coarsen_level(source, *grid(window))
+        levels.append(level)
+        tables[window] = _window_table(level, window, 1)
+    return tables
+
+
+def compute_windowed_metrics(sent_times, send_times, recv_times, delays, recv_sizes,
+                             jitter_times=None, jitter=None, window=1.0, step=None):
+    """
+    计算UDP链路的逐窗口指标表（单个窗口长度，见compute_window_tables）
+
+    Args:
+        window (float): 窗口长度（秒）
+        step (float): 滑动步长（秒），为None时使用滚动窗口
+
+    Returns:
+        DataFrame: 每行一个窗口，列见WINDOW_COLUMNS；时间为Unix秒，延迟和抖动为毫秒
+    """
+    return compute_window_tables(sent_times, send_times, recv_times, delays, recv_sizes,
+                                 jitter_times, jitter, windows=(window,), step=step)[float(window)]